@@ -0,0 +1,50 @@
+"""
+Measure the runner overhead of executor.execute_method around a no-op step.
+
+Usage: python benchmarks/execute_method_benchmark.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from getgauge.executor import create_execution_status_response, execute_method  # noqa: E402
+from getgauge.registry import registry  # noqa: E402
+
+
+def no_op_step(value):
+    pass
+
+
+class Steps:
+    def no_op_method(self, value):
+        pass
+
+
+def measure(info, iterations):
+    params = ['value']
+    start = time.perf_counter()
+    for _ in range(iterations):
+        execute_method(params, info, create_execution_status_response(), registry.is_continue_on_failure)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    args.add_argument('--iterations', type=int, default=100000, help='number of executions')
+    options = args.parse_args()
+
+    registry.add_step('no-op function <value>', no_op_step, __file__)
+    registry.add_step('no-op method <value>', Steps.no_op_method, __file__)
+    method_info = registry.get_info_for('no-op method {}')
+    method_info.instance = Steps()
+
+    for name, info in [('function', registry.get_info_for('no-op function {}')), ('method', method_info)]:
+        per_call = measure(info, options.iterations)
+        print('{:9}: {:8.2f} us per execute_method'.format(name, per_call * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Compare the ast based Parser with the RedBaron backend on a generated
+corpus of step implementation files.
+
+Usage: python benchmarks/parser_benchmark.py [--files N] [--steps N]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from getgauge.parser import Parser  # noqa: E402
+from getgauge.redbaron_parser import RedBaronParser  # noqa: E402
+
+STEP_TEMPLATE = '''
+@step("Step {file} {index} with <arg>")
+def step_{file}_{index}(arg):
+    values = [arg for _ in range(10)]
+    # a comment describing the check
+    assert len(values) == 10, "expected ten values"
+
+'''
+
+CLASS_STEP_TEMPLATE = '''
+    @step(["Alias {file} {index} <a>", "Other alias {file} {index} <a>"])
+    def alias_{file}_{index}(self, a):
+        if a:
+            return a
+        return None
+
+'''
+
+
+def generate_corpus(directory, files, steps):
+    for f in range(files):
+        content = ['from getgauge.python import step\n']
+        content.extend(STEP_TEMPLATE.format(file=f, index=i) for i in range(steps))
+        content.append('\nclass Steps{}:\n'.format(f))
+        content.extend(CLASS_STEP_TEMPLATE.format(file=f, index=i) for i in range(steps))
+        with open(os.path.join(directory, 'steps_{}.py'.format(f)), 'w', encoding='utf-8') as out:
+            out.write(''.join(content))
+
+
+def scan(parser_class, paths):
+    """Parse every file and resolve all steps and spans, as the static loader does."""
+    result = []
+    for file_path in paths:
+        for step, func, span in parser_class.parse(file_path).iter_steps():
+            result.append((step, func, span() if callable(span) else span))
+    return result
+
+
+def measure(parser_class, paths):
+    start = time.perf_counter()
+    result = scan(parser_class, paths)
+    return time.perf_counter() - start, result
+
+
+def main():
+    args = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    args.add_argument('--files', type=int, default=100, help='number of generated files')
+    args.add_argument('--steps', type=int, default=20, help='steps per file (module level and in a class)')
+    options = args.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='gauge-parser-benchmark-')
+    try:
+        generate_corpus(directory, options.files, options.steps)
+        paths = sorted(os.path.join(directory, f) for f in os.listdir(directory))
+        ast_time, ast_steps = measure(Parser, paths)
+        redbaron_time, redbaron_steps = measure(RedBaronParser, paths)
+    finally:
+        shutil.rmtree(directory)
+
+    print('files: {}, steps: {}'.format(len(paths), len(ast_steps)))
+    print('ast      : {:8.3f}s'.format(ast_time))
+    print('redbaron : {:8.3f}s'.format(redbaron_time))
+    print('speedup  : {:8.1f}x'.format(redbaron_time / ast_time))
+    if ast_steps != redbaron_steps:
+        print('backends disagree on steps or spans')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,11 @@
+import asyncio
 import inspect
 import os
-import sys
+import threading
 import time
 import traceback
 
+from getgauge import profiler
 from getgauge.exceptions import SkipScenarioException
 from getgauge.messages.messages_pb2 import ExecutionStatusResponse
 from getgauge.messages.spec_pb2 import ProtoExecutionResult
@@ -19,8 +21,9 @@ def create_execution_status_response():
 
 def run_hook(request, hooks, execution_info):
     response = create_execution_status_response()
+    kind = profiler.hook_kind(request) if profiler.enabled and hooks else None
     for hook in hooks:
-        execute_method([execution_info], hook, response)
+        execute_method([execution_info], hook, response, hook_kind=kind)
     return response
 
 
@@ -28,11 +31,18 @@ def _false(func, exception):
     return False
 
 
-def execute_method(params, step, response, is_continue_on_failure=_false):
+def execute_method(params, step, response, is_continue_on_failure=_false, hook_kind=None):
     start = _current_time()
     try:
         params = _get_args(params, step)
-        step.impl(*params)
+        start_ns = time.perf_counter_ns()
+        try:
+            result = step.impl(*params)
+            if inspect.isawaitable(result):
+                event_loop().run_until_complete(result)
+        finally:
+            if profiler.enabled:
+                profiler.record_implementation(step, hook_kind, time.perf_counter_ns() - start_ns)
     except SkipScenarioException as e:
         response.executionResult.skipScenario = True
         MessagesStore.write_message(str(e))
@@ -43,25 +53,50 @@ def execute_method(params, step, response, is_continue_on_failure=_false):
     response.executionResult.screenshotFiles.extend(ScreenshotsStore.pending_screenshots())
 
 
+_thread_state = threading.local()
+
+
+class _ThreadEventLoop(object):
+    """ Closes the event loop of a thread as the thread ends, before garbage collection can tear it apart. """
+    __slots__ = ('loop',)
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+
+    def __del__(self):
+        if not self.loop.is_closed():
+            self.loop.close()
+
+
+def event_loop():
+    """
+    Event loop on which async step and hook implementations of the calling
+    thread are awaited. It lives as long as the thread, so implementations
+    can share loop bound resources (like client sessions) across steps.
+    """
+    state = getattr(_thread_state, 'event_loop', None)
+    if state is None or state.loop.is_closed():
+        state = _thread_state.event_loop = _ThreadEventLoop()
+        asyncio.set_event_loop(state.loop)
+    return state.loop
+
+
 def _current_time():
     return int(round(time.time() * 1000))
 
 
 def _get_args(params, hook_or_step):
-    _params = [hook_or_step.instance] if hook_or_step.instance is not None else []
-    args_length = 0
-    if sys.version_info < (3, 3):
-        args_length = len(inspect.getargspec(hook_or_step.impl).args)
-    else:
-        args_length = len(inspect.signature(hook_or_step.impl).parameters)
+    args_length = hook_or_step.args_length
     if args_length < 1:
         return []
-    return (_params + params) if args_length > len(params) else params
+    if args_length > len(params) and hook_or_step.instance is not None:
+        return [hook_or_step.instance] + params
+    return params
 
 def _add_exception(e, response, continue_on_failure):
+    failure_screenshot = None
     if os.getenv('screenshot_on_failure') == 'true':
-        screenshot = ScreenshotsStore.capture_to_file()
-        response.executionResult.failureScreenshotFile = screenshot
+        failure_screenshot = ScreenshotsStore.capture_file()
     response.executionResult.failed = True
     message = str(e)
     if not message:
@@ -73,3 +108,6 @@ def _add_exception(e, response, continue_on_failure):
         response.executionResult.recoverableError = True
     response.executionResult.message.extend(MessagesStore.pending_messages())
     response.executionResult.screenshotFiles.extend(ScreenshotsStore.pending_screenshots())
+    if failure_screenshot is not None:
+        # Only known once written, which pending_screenshots waited for.
+        response.executionResult.failureScreenshotFile = failure_screenshot.result()
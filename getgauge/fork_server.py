@@ -0,0 +1,297 @@
+"""
+Fork server for the runners of parallel streams, on Linux.
+
+The first runner started with GAUGE_PYTHON_FORK_SERVER spawns a server, which
+imports getgauge, grpc and the step implementations with their dependencies
+once. Every runner then asks the server for a child over a unix socket,
+passing along its standard streams, environment and working directory. The
+child is forked with those modules already imported, sharing their pages copy
+on write, and serves Gauge in place of the runner. The runner waits for the
+child and exits with its status; a child whose runner goes away is terminated.
+
+A server only serves the runners of the Gauge process which started the
+runner spawning it, so that it never forks children from code or settings of
+an earlier execution, and exits along with that process. Its socket lives in
+a directory only the user can access, and both ends check that the other runs
+as the same user before trusting it with file descriptors and environment.
+
+This module only imports the standard library, besides getgauge.util and
+getgauge.logger which do not import anything else, so runners stay cheap to
+start.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import selectors
+import signal
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+from getgauge import logger
+from getgauge.util import PROJECT_ROOT_ENV, STEP_IMPL_DIR_ENV
+
+IDLE_TIMEOUT = 300
+CONNECT_TIMEOUT = 60
+_INT = struct.Struct('!i')
+_CREDENTIALS = struct.Struct('3i')
+# The Gauge process whose runners a server serves, set for the server spawned.
+_OWNER_ENV = 'GAUGE_PYTHON_FORK_SERVER_OWNER'
+
+
+def is_supported():
+    return sys.platform.startswith('linux') and hasattr(socket, 'send_fds')
+
+
+def socket_path(owner):
+    """
+    Socket of the fork server for owner, the Gauge process, and this
+    interpreter, getgauge, project and step implementation dirs.
+    """
+    key = '\0'.join([owner, sys.executable, os.path.dirname(os.path.abspath(__file__)),
+                     os.path.abspath(os.getenv(PROJECT_ROOT_ENV, '')), os.getenv(STEP_IMPL_DIR_ENV, '')])
+    return os.path.join(_private_dir(), '{}.sock'.format(hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]))
+
+
+def run_runner(server_command):
+    """
+    Have the fork server fork a runner for the standard streams, environment
+    and working directory of this process, starting the server with
+    server_command if it is not running. Returns the exit status of the runner.
+    Raises OSError when no child was forked, as when the server cannot be
+    started or does not run as the same user.
+    """
+    request = json.dumps({'env': dict(os.environ), 'cwd': os.getcwd(), 'argv': sys.argv}).encode('utf-8')
+    owner = _process(os.getppid()) or str(os.getppid())
+    while True:
+        with _connect(server_command, owner) as connection:
+            socket.send_fds(connection, [_INT.pack(len(request))], [0, 1, 2])
+            connection.sendall(request)
+            # The server acknowledges with the pid of the child, unless it
+            # exited before accepting the request, in which case try again.
+            if len(_recv_exactly(connection, _INT.size)) < _INT.size:
+                continue
+            # The child serves Gauge from now on, failures only end it.
+            try:
+                status = _recv_exactly(connection, _INT.size)
+            except OSError:
+                status = b''
+        if len(status) < _INT.size:
+            return 1
+        status = _INT.unpack(status)[0]
+        return status if status >= 0 else 128 - status
+
+
+def serve(prewarm, run_child, idle_timeout=IDLE_TIMEOUT):
+    """
+    Call prewarm, then fork a child calling run_child for every runner, until
+    the Gauge process owning the server exits, or no child has been running
+    for idle_timeout seconds. Returns right away if another server already
+    serves the socket.
+    """
+    owner = os.getenv(_OWNER_ENV) or _process(os.getppid()) or str(os.getppid())
+    path = socket_path(owner)
+    lock = open(path + '.lock', 'w')
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(64)
+    signal.signal(signal.SIGTERM, _exit)
+    # Lines are written right away, no writer thread is left holding locks
+    # in the children.
+    logger.unbuffer()
+    try:
+        prewarm()
+        _serve(listener, run_child, idle_timeout, owner)
+    finally:
+        os.unlink(path)
+        listener.close()
+        # Every execution has a server of its own, keep only logs worth reading.
+        os.unlink(path + '.lock')
+        lock.close()
+        if os.path.exists(path + '.log') and not os.path.getsize(path + '.log'):
+            os.unlink(path + '.log')
+
+
+def _private_dir():
+    """ Directory of the sockets of fork servers, which only the current user can access. """
+    runtime_dir = os.getenv('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        path = os.path.join(runtime_dir, 'gauge-python')
+    else:
+        path = os.path.join(tempfile.gettempdir(), 'gauge-python-{}'.format(os.getuid()))
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError('{} is not a directory only the current user can access'.format(path))
+    return path
+
+
+def _process(pid):
+    """
+    Pid and start time of process pid, which tell it apart from processes
+    reusing the pid later, or None once it exited.
+    """
+    try:
+        with open('/proc/{}/stat'.format(pid)) as f:
+            start_time = f.read().rpartition(')')[2].split()[19]
+    except (OSError, IndexError):
+        return None
+    return '{}-{}'.format(pid, start_time)
+
+
+def _is_running(owner):
+    return _process(owner.split('-')[0]) == owner
+
+
+def _is_same_user(connection):
+    """ Whether the process at the other end of connection runs as the current user. """
+    credentials = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _CREDENTIALS.size)
+    return _CREDENTIALS.unpack(credentials)[1] == os.getuid()
+
+
+def _connect(server_command, owner):
+    path = socket_path(owner)
+    deadline = None
+    while True:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            connection.close()
+        else:
+            if not _is_same_user(connection):
+                connection.close()
+                raise PermissionError('Fork server on {} does not run as the current user'.format(path))
+            return connection
+        if deadline is None:
+            deadline = time.monotonic() + CONNECT_TIMEOUT
+            with open(path + '.log', 'a') as log:
+                subprocess.Popen(server_command, stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+                                 env=dict(os.environ, **{_OWNER_ENV: owner}), start_new_session=True)
+        elif time.monotonic() > deadline:
+            raise TimeoutError('Fork server did not start listening on {}'.format(path))
+        time.sleep(0.05)
+
+
+def _serve(listener, run_child, idle_timeout, owner):
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+    children = {}
+    idle_since = time.monotonic()
+    while _is_running(owner) and (children or time.monotonic() - idle_since < idle_timeout):
+        for key, _ in selector.select(timeout=0.2):
+            if key.fileobj is listener:
+                connection, _ = listener.accept()
+                if not _is_same_user(connection):
+                    connection.close()
+                    continue
+                pid = _fork(connection, listener, children, run_child)
+                children[pid] = connection
+                selector.register(connection, selectors.EVENT_READ, pid)
+            else:
+                # The runner went away, its child is of no use to Gauge anymore.
+                selector.unregister(key.fileobj)
+                _terminate(key.data)
+        for pid, status in _reap(children):
+            connection = children.pop(pid)
+            try:
+                selector.unregister(connection)
+            except KeyError:
+                pass
+            try:
+                connection.sendall(_INT.pack(os.waitstatus_to_exitcode(status)))
+            except OSError:
+                pass
+            connection.close()
+            idle_since = time.monotonic()
+    # Gauge is gone, and with it any use for the children left.
+    for pid in children:
+        _terminate(pid)
+
+
+def _fork(connection, listener, children, run_child):
+    header, fds, _, _ = socket.recv_fds(connection, _INT.size, 3)
+    request = json.loads(_recv_exactly(connection, _INT.unpack(header)[0]).decode('utf-8'))
+    logger.flush()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid:
+        for fd in fds:
+            os.close(fd)
+        try:
+            connection.sendall(_INT.pack(pid))
+        except OSError:
+            pass
+        return pid
+    code = 1
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        for other in [listener, connection] + list(children.values()):
+            other.close()
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.environ.clear()
+        os.environ.update(request['env'])
+        os.chdir(request['cwd'])
+        sys.argv = request['argv']
+        run_child()
+        code = 0
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        logger.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def _reap(children):
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        if pid in children:
+            yield pid, status
+
+
+def _exit(signum, frame):
+    sys.exit(0)
+
+
+def _terminate(pid):
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        pass
+
+
+def _recv_exactly(connection, size):
+    data = b''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
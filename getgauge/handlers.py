@@ -1,69 +1,240 @@
+import asyncio
+import queue
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from getgauge import logger, processor
+import grpc
+
+from getgauge import logger, processor, profiler
 from getgauge.messages import services_pb2_grpc as sp
-from getgauge.messages.messages_pb2 import Empty
+from getgauge.messages.messages_pb2 import Empty, ExecuteStepRequest, ExecutionStatusResponse, Message
+from getgauge.registry import registry
+from getgauge.util import use_parallel_streams
 
 kill_event = threading.Event()
+RUNNER_SERVICE = 'gauge.messages.Runner'
+
+
+def add_runner_extensions_to_server(handler, server):
+    """
+    Register runner methods which are not (yet) part of the gauge-proto Runner
+    service, under the same service name.
+
+    ExecuteSteps: the caller streams Messages wrapping the StepExecutionStarting,
+    ExecuteStep and StepExecutionEnding requests of consecutive steps and gets
+    back an ExecutionStatusResponse per processed request, in one round trip.
+
+    ExecuteStepStream and ExecuteStepsStream: like ExecuteStep and ExecuteSteps,
+    but messages and screenshots written by the implementations are streamed
+    back as they come, each in a response of its own ahead of the result(s).
+    """
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(RUNNER_SERVICE, {
+        'ExecuteSteps': grpc.stream_stream_rpc_method_handler(
+            handler.ExecuteSteps,
+            request_deserializer=Message.FromString,
+            response_serializer=ExecutionStatusResponse.SerializeToString,
+        ),
+        'ExecuteStepStream': grpc.unary_stream_rpc_method_handler(
+            handler.ExecuteStepStream,
+            request_deserializer=ExecuteStepRequest.FromString,
+            response_serializer=ExecutionStatusResponse.SerializeToString,
+        ),
+        'ExecuteStepsStream': grpc.stream_stream_rpc_method_handler(
+            handler.ExecuteStepsStream,
+            request_deserializer=Message.FromString,
+            response_serializer=ExecutionStatusResponse.SerializeToString,
+        ),
+    }),))
+
+
+def _stream_of(args):
+    """ Stream of the execution request among args, or of the first request of a batch. """
+    for arg in args:
+        if isinstance(arg, (list, tuple)):
+            return _stream_of(arg)
+        if isinstance(arg, Message):
+            return _stream_of([arg.stepExecutionStartingRequest, arg.executeStepRequest,
+                               arg.stepExecutionEndingRequest])
+        if getattr(arg, 'stream', 0):
+            return arg.stream
+    return 0
 
 
 class GrpcServiceHandler(sp.RunnerServicer):
+    """
+    The server may call the handler from several threads. Language server
+    queries only read the registry and run concurrently, while requests that
+    change it, or rewrite implementation files like refactoring, take the
+    registry lock exclusively. Files are parsed before taking it, so that
+    queries only wait for their steps to be swapped. Execution requests run
+    one at a time on a single dedicated thread, so step implementations
+    always see the same thread, as with a single worker server. They only
+    take the registry lock to look up steps and hooks, never while running
+    implementations.
+
+    With multithreading enabled, Gauge runs parallel streams in this runner.
+    The execution requests of each stream then run on a dedicated thread of
+    their own, with data stores, messages and screenshots of their own.
 
-    def __init__(self, server):
+    load_steps, which loads the steps statically, is only called before the
+    first language server request. Executions import the steps instead, so
+    it is not called at all once an execution starts. Neither is it for step
+    validation, which Gauge asks for ahead of every execution: the steps are
+    imported for it, as the execution is about to import them anyway.
+    """
+
+    def __init__(self, server, load_steps=None):
         self.server = server
+        self.load_steps, self.load_steps_lock = load_steps, threading.Lock()
         self.kill_event = threading.Event()
+        self.registry_lock = registry.lock
+        self.execution_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix='execution')
+        self.parallel_streams = use_parallel_streams()
+        self.stream_threads, self.stream_threads_lock = {}, threading.Lock()
+
+    def _read(self, process, *args):
+        try:
+            with self.registry_lock.read():
+                return profiler.call(process, *args)
+        finally:
+            logger.flush()
+
+    def _write(self, process, *args):
+        try:
+            with self.registry_lock.write():
+                return profiler.call(process, *args)
+        finally:
+            logger.flush()
+
+    def _run(self, process, *args):
+        # Execution requests take the registry lock only around their lookups.
+        try:
+            return profiler.call(process, *args)
+        finally:
+            logger.flush()
+
+    def _load_steps(self):
+        if self.load_steps is None:
+            return
+        with self.load_steps_lock:
+            if self.load_steps is not None:
+                with self.registry_lock.write():
+                    self.load_steps()
+                self.load_steps = None
+
+    def _import_steps(self):
+        if self.load_steps is None:
+            return
+        with self.load_steps_lock:
+            if self.load_steps is not None:
+                with self.registry_lock.write():
+                    processor.import_impls()
+                self.load_steps = None
+
+    def _query(self, process, *args):
+        self._load_steps()
+        return self._read(process, *args)
+
+    def _validate(self, process, *args):
+        self._import_steps()
+        return self._read(process, *args)
+
+    def _update(self, process, *args):
+        self._load_steps()
+        return self._write(process, *args)
+
+    def _cache_file(self, request):
+        self._load_steps()
+        parsed = profiler.call(processor.parse_cache_file_request, request)
+        return self._write(processor.apply_cache_file_request, request, parsed)
+
+    def _execution_thread_of(self, stream):
+        if not self.parallel_streams or not stream:
+            return self.execution_thread
+        with self.stream_threads_lock:
+            thread = self.stream_threads.get(stream)
+            if thread is None:
+                thread = self.stream_threads[stream] = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix='execution-{}'.format(stream), initializer=processor.bind_stream)
+            return thread
+
+    def _submit_execution(self, process, *args, stream=None):
+        if stream is None:
+            stream = _stream_of(args)
+        return self._execution_thread_of(stream).submit(self._run, process, *args)
+
+    def _execute(self, process, *args, stream=None):
+        return self._submit_execution(process, *args, stream=stream).result()
+
+    def _stream(self, process, *args):
+        responses = queue.Queue()
+        execution = self._submit_execution(processor.process_streamed, process, args, responses.put)
+        execution.add_done_callback(lambda _: responses.put(None))
+        for response in iter(responses.get, None):
+            yield response
+        execution.result()
 
     def InitializeSuiteDataStore(self, request, context):
-        return processor.process_suite_data_store_init_request()
+        return self._execute(processor.process_suite_data_store_init_request, stream=request.stream)
 
     def StartExecution(self, request, context):
-        return processor.process_execution_starting_request(request)
+        self.load_steps = None
+        return self._execute(processor.process_execution_starting_request, request)
 
     def InitializeSpecDataStore(self, request, context):
-        return processor.process_spec_data_store_init_request()
+        return self._execute(processor.process_spec_data_store_init_request, stream=request.stream)
 
     def StartSpecExecution(self, request, context):
-        return processor.process_spec_execution_starting_request(request)
+        return self._execute(processor.process_spec_execution_starting_request, request)
 
     def InitializeScenarioDataStore(self, request, context):
-        return processor.process_scenario_data_store_init_request()
+        return self._execute(processor.process_scenario_data_store_init_request, stream=request.stream)
 
     def StartScenarioExecution(self, request, context):
-        return processor.process_scenario_execution_starting_request(request)
+        return self._execute(processor.process_scenario_execution_starting_request, request)
 
     def StartStepExecution(self, request, context):
-        return processor.process_step_execution_starting_request(request)
+        return self._execute(processor.process_step_execution_starting_request, request)
 
     def ExecuteStep(self, request, context):
-        return processor.process_execute_step_request(request)
+        return self._execute(processor.process_execute_step_request, request)
 
     def FinishStepExecution(self, request, context):
-        return processor.process_step_execution_ending_request(request)
+        return self._execute(processor.process_step_execution_ending_request, request)
 
     def FinishScenarioExecution(self, request, context):
-        return processor.process_scenario_execution_ending_request(request)
+        return self._execute(processor.process_scenario_execution_ending_request, request)
 
     def FinishSpecExecution(self, request, context):
-        return processor.process_spec_execution_ending_request(request)
+        return self._execute(processor.process_spec_execution_ending_request, request)
 
     def FinishExecution(self, request, context):
-        return processor.process_execution_ending_request(request)
+        return self._execute(processor.process_execution_ending_request, request)
+
+    def ExecuteSteps(self, request_iterator, context):
+        return iter(self._execute(processor.process_execute_steps_request, list(request_iterator)))
+
+    def ExecuteStepStream(self, request, context):
+        return self._stream(processor.process_execute_step_request, request)
+
+    def ExecuteStepsStream(self, request_iterator, context):
+        return self._stream(processor.iter_execute_steps_request, list(request_iterator))
 
     def CacheFile(self, request, context):
-        return processor.process_cache_file_request(request)
+        return self._cache_file(request)
 
     def GetStepName(self, request, context):
-        return processor.process_step_name_request(request)
+        return self._query(processor.process_step_name_request, request)
 
     def GetGlobPatterns(self, request, context):
         return processor.process_glob_pattern_request(request)
 
     def GetStepNames(self, request, context):
-        return processor.process_step_names_request()
+        return self._query(processor.process_step_names_request)
 
     def GetStepPositions(self, request, context):
-        return processor.process_step_positions_request(request)
+        return self._query(processor.process_step_positions_request, request)
 
     def GetImplementationFiles(self, request, context):
         return processor.process_impl_files_request()
@@ -72,10 +243,10 @@ class GrpcServiceHandler(sp.RunnerServicer):
         return processor.process_stub_impl_request(request)
 
     def Refactor(self, request, context):
-        return processor.process_refactor_request(request)
+        return self._update(processor.process_refactor_request, request)
 
     def ValidateStep(self, request, context):
-        return processor.process_validate_step_request(request)
+        return self._validate(processor.process_validate_step_request, request)
 
     def Kill(self, request, context):
         logger.debug("KillProcessrequest received")
@@ -87,3 +258,124 @@ class GrpcServiceHandler(sp.RunnerServicer):
         time.sleep(0.5)
         self.server.stop(0)
         exit(0)
+
+
+class AsyncGrpcServiceHandler(GrpcServiceHandler):
+    """
+    Handler for a grpc.aio server. Requests are coroutines which wait for the
+    blocking processing on other threads, execution requests still run one
+    at a time on the dedicated execution thread.
+    """
+
+    async def _query_async(self, process, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, self._query, process, *args)
+
+    async def _update_async(self, process, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, self._update, process, *args)
+
+    async def _validate_async(self, process, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, self._validate, process, *args)
+
+    async def _execute_async(self, process, *args, stream=None):
+        return await asyncio.wrap_future(self._submit_execution(process, *args, stream=stream))
+
+    async def _stream_async(self, process, *args):
+        loop, responses = asyncio.get_running_loop(), asyncio.Queue()
+
+        def send(response):
+            loop.call_soon_threadsafe(responses.put_nowait, response)
+
+        execution = asyncio.wrap_future(self._submit_execution(processor.process_streamed, process, args, send))
+        execution.add_done_callback(lambda _: responses.put_nowait(None))
+        while True:
+            response = await responses.get()
+            if response is None:
+                break
+            yield response
+        await execution
+
+    async def InitializeSuiteDataStore(self, request, context):
+        return await self._execute_async(processor.process_suite_data_store_init_request, stream=request.stream)
+
+    async def StartExecution(self, request, context):
+        self.load_steps = None
+        return await self._execute_async(processor.process_execution_starting_request, request)
+
+    async def InitializeSpecDataStore(self, request, context):
+        return await self._execute_async(processor.process_spec_data_store_init_request, stream=request.stream)
+
+    async def StartSpecExecution(self, request, context):
+        return await self._execute_async(processor.process_spec_execution_starting_request, request)
+
+    async def InitializeScenarioDataStore(self, request, context):
+        return await self._execute_async(processor.process_scenario_data_store_init_request, stream=request.stream)
+
+    async def StartScenarioExecution(self, request, context):
+        return await self._execute_async(processor.process_scenario_execution_starting_request, request)
+
+    async def StartStepExecution(self, request, context):
+        return await self._execute_async(processor.process_step_execution_starting_request, request)
+
+    async def ExecuteStep(self, request, context):
+        return await self._execute_async(processor.process_execute_step_request, request)
+
+    async def FinishStepExecution(self, request, context):
+        return await self._execute_async(processor.process_step_execution_ending_request, request)
+
+    async def FinishScenarioExecution(self, request, context):
+        return await self._execute_async(processor.process_scenario_execution_ending_request, request)
+
+    async def FinishSpecExecution(self, request, context):
+        return await self._execute_async(processor.process_spec_execution_ending_request, request)
+
+    async def FinishExecution(self, request, context):
+        return await self._execute_async(processor.process_execution_ending_request, request)
+
+    async def ExecuteSteps(self, request_iterator, context):
+        requests = [request async for request in request_iterator]
+        for response in await self._execute_async(processor.process_execute_steps_request, requests):
+            yield response
+
+    async def ExecuteStepStream(self, request, context):
+        async for response in self._stream_async(processor.process_execute_step_request, request):
+            yield response
+
+    async def ExecuteStepsStream(self, request_iterator, context):
+        requests = [request async for request in request_iterator]
+        async for response in self._stream_async(processor.iter_execute_steps_request, requests):
+            yield response
+
+    async def CacheFile(self, request, context):
+        return await asyncio.get_running_loop().run_in_executor(None, self._cache_file, request)
+
+    async def GetStepName(self, request, context):
+        return await self._query_async(processor.process_step_name_request, request)
+
+    async def GetGlobPatterns(self, request, context):
+        return processor.process_glob_pattern_request(request)
+
+    async def GetStepNames(self, request, context):
+        return await self._query_async(processor.process_step_names_request)
+
+    async def GetStepPositions(self, request, context):
+        return await self._query_async(processor.process_step_positions_request, request)
+
+    async def GetImplementationFiles(self, request, context):
+        return await asyncio.get_running_loop().run_in_executor(None, processor.process_impl_files_request)
+
+    async def ImplementStub(self, request, context):
+        return await asyncio.get_running_loop().run_in_executor(None, processor.process_stub_impl_request, request)
+
+    async def Refactor(self, request, context):
+        return await self._update_async(processor.process_refactor_request, request)
+
+    async def ValidateStep(self, request, context):
+        return await self._validate_async(processor.process_validate_step_request, request)
+
+    async def Kill(self, request, context):
+        return super().Kill(request, context)
+
+    async def wait_for_kill_event(self):
+        await asyncio.get_running_loop().run_in_executor(None, self.kill_event.wait)
+        await asyncio.sleep(0.5)
+        await self.server.stop(0)
@@ -1,16 +1,18 @@
+import hashlib
 import importlib
 import inspect
 import json
 import os
-import re
 import shutil
 import sys
 import traceback
+from collections import namedtuple
 from contextlib import contextmanager
 from os import path
 
 from getgauge import logger
-from getgauge.registry import registry
+from getgauge.python import _is_marked
+from getgauge.registry import _path_key, registry
 from getgauge.util import get_project_root, get_step_impl_dirs
 
 project_root = get_project_root()
@@ -25,8 +27,52 @@ PYTHON_PROPERTIES = 'python.properties'
 SKEL = 'skel'
 
 
+# Step implementation files imported so far, by normalized path, with the
+# steps and hooks they registered, so that an execution only imports again
+# the files which changed since.
+_imported_files = {}
+_ImportedFile = namedtuple('_ImportedFile', 'module_name mtime_ns size digest methods')
+
+
 def load_impls(step_impl_dirs=impl_dirs):
     os.chdir(project_root)
+    for base_dir, file_path in _iter_impl_files(step_impl_dirs):
+        _import_file(base_dir, file_path)
+
+
+def reload_impls(step_impl_dirs=impl_dirs):
+    """
+    Bring the registry up to date with the step implementation files. The
+    first time, it is cleared and every file is imported. Later on, only the
+    files that changed on disk, or whose steps and hooks were replaced in the
+    meantime (as the language server does for files being edited), are
+    imported again. The steps and hooks of all other files stay registered.
+    """
+    if not _imported_files:
+        registry.clear()
+        load_impls(step_impl_dirs)
+        return
+    os.chdir(project_root)
+    importlib.invalidate_caches()
+    found = set()
+    for base_dir, file_path in _iter_impl_files(step_impl_dirs):
+        key = _path_key(file_path)
+        found.add(key)
+        if not _is_unchanged(_imported_files.get(key), file_path):
+            _forget_file(key, file_path)
+            _import_file(base_dir, file_path)
+    for key in set(_imported_files) - found:
+        _forget_file(key, key)
+
+
+def forget_impls():
+    """ Forget the imported step implementation files, the next reload imports all of them again. """
+    for imported in _imported_files.values():
+        sys.modules.pop(imported.module_name, None)
+    _imported_files.clear()
+
+
+def _iter_impl_files(step_impl_dirs):
     for impl_dir in step_impl_dirs:
         if not os.path.isdir(impl_dir):
             logger.error('Cannot import step implementations. Error: {} does not exist.'.format(step_impl_dirs))
@@ -39,7 +85,36 @@ def load_impls(step_impl_dirs=impl_dirs):
         # Add temporary sys path for relative imports that is not already added
         if '..' in impl_dir and base_dir not in temporary_sys_path:
             temporary_sys_path.append(base_dir)
-        _import_impl(base_dir, impl_dir)
+        for file_path in _iter_files(impl_dir):
+            yield base_dir, file_path
+
+
+def _is_unchanged(imported, file_path):
+    if imported is None:
+        return False
+    # The language server replaces the steps of files being edited.
+    methods = registry.get_all_methods_in(file_path)
+    if len(methods) != len(imported.methods) or any(a is not b for a, b in zip(methods, imported.methods)):
+        return False
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    if (stat.st_mtime_ns, stat.st_size) == (imported.mtime_ns, imported.size):
+        return True
+    return stat.st_size == imported.size and _digest(file_path) == imported.digest
+
+
+def _forget_file(key, file_path):
+    imported = _imported_files.pop(key, None)
+    registry.remove_file(file_path)
+    if imported is not None:
+        sys.modules.pop(imported.module_name, None)
+
+
+def _digest(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
 
 
 def copy_skel_files():
@@ -57,13 +132,13 @@ def copy_skel_files():
         logger.fatal('Exception occurred while copying skel files.\n{}.'.format(traceback.format_exc()))
 
 
-def _import_impl(base_dir, step_impl_dir):
+def _iter_files(step_impl_dir):
     for f in os.listdir(step_impl_dir):
         file_path = os.path.join(step_impl_dir, f)
         if f.endswith('.py'):
-            _import_file(base_dir, file_path)
+            yield file_path
         elif path.isdir(file_path):
-            _import_impl(base_dir, file_path)
+            yield from _iter_files(file_path)
 
 @contextmanager
 def use_temporary_sys_path():
@@ -92,9 +167,19 @@ def _import_file(base_dir, file_path):
                 # Create instance of step implementation class.
                 if _has_methods_with_gauge_decoratores(c[1]):
                     update_step_registry_with_class(c[1](), file_path) # c[1]() will create a new instance of the class
+        _record_import(module_name, file_path)
     except:
         logger.fatal('Exception occurred while loading step implementations from file: {}.\n{}'.format(rel_path, traceback.format_exc()))
 
+def _record_import(module_name, file_path):
+    try:
+        stat = os.stat(file_path)
+        digest = _digest(file_path)
+    except OSError:
+        return
+    _imported_files[_path_key(file_path)] = _ImportedFile(
+        module_name, stat.st_mtime_ns, stat.st_size, digest, registry.get_all_methods_in(file_path))
+
 # Inject instance in each class method (hook/step)
 def update_step_registry_with_class(instance, file_path):
     # Resolve the absolute path from relative path
@@ -113,9 +198,4 @@ def _get_version():
     return data[VERSION]
 
 def _has_methods_with_gauge_decoratores(klass) -> bool:
-    gauge_decorator_pattern = r"@(step|before_suite|after_suite|before_scenario|after_scenario|before_spec|after_spec|before_step|after_step|screenshot|custom_screen_grabber)"
-    sourcelines = inspect.getsourcelines(klass)[0]
-    for line in sourcelines:
-        if re.match(gauge_decorator_pattern, line.strip()) is not None:
-            return True
-    return False
+    return any(_is_marked(member) for member in vars(klass).values())
@@ -1,28 +1,163 @@
+"""
+Log lines for Gauge, one JSON object per line with logLevel and message.
+
+Messages below GAUGE_PYTHON_LOG_LEVEL are dropped before they are formatted.
+Lines for stdout are buffered and written in batches by a background thread,
+and flushed at the end of every request; errors go to stderr right away,
+after the lines buffered before them.
+"""
+import atexit
 import json
-import sys, os
+import os
+import sys
+import threading
+from json.encoder import encode_basestring_ascii
+
+from getgauge.util import get_log_level
 
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40, 'fatal': 50}
+_PREFIXES = {level: '{{"logLevel": "{0}", "message": '.format(level) for level in LEVELS}
+_threshold = LEVELS.get(get_log_level(), LEVELS['debug'])
 
-def debug(message):
-    _print('debug', message)
 
+def debug(message, *args):
+    if _threshold <= 10:
+        _print('debug', message, args)
 
-def info(message):
-    _print('info', message)
 
+def info(message, *args):
+    if _threshold <= 20:
+        _print('info', message, args)
 
-def error(message):
-    _print('error', message, True)
 
+def error(message, *args):
+    if _threshold <= 40:
+        _print('error', message, args, True)
 
-def warning(message):
-    _print('warning', message)
 
+def warning(message, *args):
+    if _threshold <= 30:
+        _print('warning', message, args)
 
-def fatal(message):
-    _print('fatal', message, True)
+
+def fatal(message, *args):
+    _print('fatal', message, args, True)
     os._exit(1)
 
 
-def _print(level, message, is_error=False):
-    stream = sys.stdout if not is_error else sys.stderr
-    stream.write("{}\n".format(json.dumps({"logLevel": level, "message": message})))
+def is_enabled(level):
+    """ Whether messages of level are logged, for callers which do more than formatting to build them. """
+    return _threshold <= LEVELS[level]
+
+
+def flush():
+    """ Write the buffered lines now. """
+    _writer.flush()
+
+
+def unbuffer():
+    """
+    Write lines right away from now on, and stop the thread writing buffered
+    lines. For a process which forks, so that no thread holds the lock of
+    stdout in its children. Children forked afterwards buffer lines again.
+    """
+    global _writer
+    writer, _writer = _writer, _DirectWriter()
+    writer.close()
+
+
+def _print(level, message, args=(), is_error=False):
+    if args:
+        message = message.format(*args)
+    text = encode_basestring_ascii(message) if type(message) is str else json.dumps(message)
+    line = '{0}{1}}}\n'.format(_PREFIXES[level], text)
+    if is_error:
+        _writer.flush()
+        sys.stderr.write(line)
+    else:
+        _writer.write(line)
+
+
+class _BufferedWriter:
+    """ Writes lines to stdout on a daemon thread, in batches of the lines buffered in the meantime. """
+
+    def __init__(self):
+        self._lines, self._ready = [], threading.Condition(threading.Lock())
+        # Held while writing, so that flushes keep the lines in order.
+        self._writing = threading.Lock()
+        self._thread, self._closed = None, False
+
+    def write(self, line):
+        with self._ready:
+            if not self._closed:
+                self._lines.append(line)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='logger', daemon=True)
+                    self._thread.start()
+                self._ready.notify()
+                return
+        # Written by a thread which looked the writer up before it was closed.
+        self.flush()
+        self._write([line])
+
+    def flush(self):
+        with self._writing:
+            self._write(self._take())
+
+    def close(self):
+        """ Stop the thread, writing the lines buffered up to then first. """
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _take(self):
+        with self._ready:
+            lines, self._lines = self._lines, []
+        return lines
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._lines and not self._closed:
+                    self._ready.wait()
+                if self._closed:
+                    return
+            self.flush()
+
+    @staticmethod
+    def _write(lines):
+        if not lines:
+            return
+        try:
+            sys.stdout.write(''.join(lines))
+            sys.stdout.flush()
+        except (OSError, ValueError):
+            pass
+
+
+class _DirectWriter:
+    """ Writes lines to stdout right away. """
+
+    @staticmethod
+    def write(line):
+        _BufferedWriter._write([line])
+
+    @staticmethod
+    def flush():
+        pass
+
+
+def _reset_writer():
+    # The thread does not survive forking, the child starts one of its own
+    # and leaves the lines buffered before forking to the parent.
+    global _writer
+    _writer = _BufferedWriter()
+
+
+_writer = _BufferedWriter()
+atexit.register(flush)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_writer)
@@ -1,5 +1,6 @@
+import ast
+
 from getgauge import logger
-from redbaron import RedBaron
 
 
 class Parser(object):
@@ -15,61 +16,78 @@ class Parser(object):
             if content is None:
                 with open(file_path, encoding='utf-8') as f:
                     content = f.read()
-            py_tree = RedBaron(content)
-            return Parser(file_path, py_tree)
+            py_tree = ast.parse(content, filename=str(file_path))
+            return Parser(file_path, content, py_tree)
         except Exception as ex:
-            # Trim parsing error message to only include failure location
-            msg = str(ex)
-            marker = "<---- here\n"
-            marker_pos = msg.find(marker)
-            if marker_pos > 0:
-                msg = msg[:marker_pos + len(marker)]
-            logger.error("Failed to parse {}: {}".format(file_path, msg))
-
-    def __init__(self, file_path, py_tree):
+            logger.error("Failed to parse {}: {}".format(file_path, ex))
+
+    def __init__(self, file_path, content, py_tree):
         self.file_path = file_path
+        self.content = content
         self.py_tree = py_tree
+        self.__lines = None
+        self.__editor = None
 
-    def _span_for_node(self, node, lazy=False):
-        def calculate_span():
-            try:
-                # For some reason RedBaron does not create absolute_bounding_box
-                # attributes for some content passed during unit test so we have
-                # to catch AttributeError here and return invalid data
-                box = node.absolute_bounding_box
-                # Column numbers start at 1 where-as we want to start at 0. Also
-                # column 0 is used to indicate end before start of line.
-                return {
-                    'start': box.top_left.line,
-                    'startChar': max(0, box.top_left.column - 1),
-                    'end': box.bottom_right.line,
-                    'endChar': max(0, box.bottom_right.column),
-                }
-            except AttributeError:
-                return {'start': 0, 'startChar': 0, 'end': 0, 'endChar': 0}
-
-        return calculate_span if lazy else calculate_span()
+    def _lines(self):
+        if self.__lines is None:
+            self.__lines = self.content.splitlines()
+        return self.__lines
+
+    def _span_for_node(self, node):
+        """
+        Span of a function definition as reported by the RedBaron backend:
+        it starts at the first decorator and ends where the next statement
+        starts, so trailing blank lines and comments of an indented body
+        belong to the function.
+        """
+        lines = self._lines()
+        start = node.decorator_list[0].lineno if node.decorator_list else node.lineno
+        start_line = lines[start - 1]
+        end = node.end_lineno
+        if not self._has_inline_body(node):
+            while end < len(lines) and _is_trivia(lines[end]):
+                end += 1
+        end_line = lines[end] if end < len(lines) else ''
+        return {
+            'start': start,
+            'startChar': _indentation(start_line),
+            'end': end + 1,
+            'endChar': _indentation(end_line),
+        }
+
+    def _has_inline_body(self, node):
+        """Whether the body follows the colon, as in `def f(): pass`."""
+        first = node.body[0]
+        line = self._lines()[first.lineno - 1].encode('utf-8')
+        return bool(line[:first.col_offset].strip())
+
+    def _iter_func_defs(self, node):
+        """Walk the tree in source order, yielding every function definition."""
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                yield child
+            yield from self._iter_func_defs(child)
 
     def _iter_step_func_decorators(self):
         """Find functions with step decorator in parsed file."""
-        for node in self.py_tree.find_all('def'):
-            for decorator in node.decorators:
-                try:
-                    if decorator.name.value == 'step':
-                        yield node, decorator
-                        break
-                except AttributeError:
-                    continue
+        for node in self._iter_func_defs(self.py_tree):
+            for decorator in node.decorator_list:
+                target = decorator.func if isinstance(decorator, ast.Call) else decorator
+                if isinstance(target, ast.Name) and target.id == 'step':
+                    yield node, decorator
+                    break
 
     def _step_decorator_args(self, decorator):
         """
         Get arguments passed to step decorators converted to python objects.
         """
-        args = decorator.call.value
+        args = []
+        if isinstance(decorator, ast.Call):
+            args = decorator.args + [k.value for k in decorator.keywords]
         step = None
         if len(args) == 1:
             try:
-                step = args[0].value.to_python()
+                step = ast.literal_eval(args[0])
             except (ValueError, SyntaxError):
                 pass
             if isinstance(step, str) or isinstance(step, list):
@@ -84,43 +102,19 @@ class Parser(object):
         for func, decorator in self._iter_step_func_decorators():
             step = self._step_decorator_args(decorator)
             if step:
-                yield step, func.name, self._span_for_node(func, True)
+                yield step, func.name, self._span_for_node(func)
 
-    def _find_step_node(self, step_text):
-        """Find the ast node which contains the text."""
-        for func, decorator in self._iter_step_func_decorators():
-            step = self._step_decorator_args(decorator)
-            arg_node = decorator.call.value[0].value
-            if step == step_text:
-                return arg_node, func
-            if isinstance(step, list) and step_text in step:
-                step_node = arg_node[step.index(step_text)]
-                return step_node, func
-        return None, None
-
-    def _refactor_step_text(self, step, old_text, new_text):
-        step_span = self._span_for_node(step, False)
-        step.value = step.value.replace(old_text, new_text)
-        return step_span, step.value
-
-    def _get_param_name(self, param_nodes, i):
-        name = 'arg{}'.format(i)
-        if name not in [x.name.value for x in param_nodes]:
-            return name
-        return self._get_param_name(param_nodes, i + 1)
-
-    def _move_params(self, params, move_param_from_idx):
-        # If the move list is exactly same as current params
-        # list then no need to create a new list.
-        if list(range(len(params))) == move_param_from_idx:
-            return params
-        new_params = []
-        for (new_idx, old_idx) in enumerate(move_param_from_idx):
-            if old_idx < 0:
-                new_params.append(self._get_param_name(params, new_idx))
-            else:
-                new_params.append(params[old_idx].name.value)
-        return ', '.join(new_params)
+    def _editor(self):
+        """
+        Lossless RedBaron tree of the file, only built (and imported) when
+        the file content has to be modified.
+        """
+        if self.__editor is None:
+            from getgauge.redbaron_parser import RedBaronParser
+            self.__editor = RedBaronParser.parse(self.file_path, self.content)
+            if self.__editor is None:
+                raise SyntaxError("Unable to parse {} for refactoring".format(self.file_path))
+        return self.__editor
 
     def refactor_step(self, old_text, new_text, move_param_from_idx):
         """
@@ -129,19 +123,19 @@ class Parser(object):
         to move_param_from_idx.  Each entry in this list should
         specify parameter position from old
         """
-        diffs = []
-        step, func = self._find_step_node(old_text)
-        if step is None:
-            return diffs
-        step_diff = self._refactor_step_text(step, old_text, new_text)
-        diffs.append(step_diff)
-        moved_params = self._move_params(func.arguments, move_param_from_idx)
-        if func.arguments is not moved_params:
-            params_span = self._span_for_node(func.arguments, False)
-            func.arguments = moved_params
-            diffs.append((params_span, func.arguments.dumps()))
-        return diffs
+        return self._editor().refactor_step(old_text, new_text, move_param_from_idx)
 
     def get_code(self):
         """Return current content of the tree."""
-        return self.py_tree.dumps()
+        if self.__editor is None:
+            return self.content
+        return self.__editor.get_code()
+
+
+def _indentation(line):
+    return len(line) - len(line.lstrip())
+
+
+def _is_trivia(line):
+    stripped = line.strip()
+    return not stripped or stripped.startswith('#')
@@ -1,23 +1,31 @@
+import time
+from collections import namedtuple
 from os import path
 
+from getgauge import profiler
 from getgauge.executor import (create_execution_status_response,
                                execute_method, run_hook)
-from getgauge.impl_loader import load_impls
+from getgauge.impl_loader import reload_impls
 from getgauge.messages.messages_pb2 import *
 from getgauge.messages.spec_pb2 import Parameter, Span
 from getgauge.python import Table, create_execution_context_from, data_store
-from getgauge.refactor import refactor_step
 from getgauge.registry import MessagesStore, ScreenshotsStore, registry
-from getgauge.static_loader import reload_steps
 from getgauge.util import (get_file_name, get_impl_files, get_step_impl_dirs,
                            read_file_contents)
-from getgauge.validator import validate_step
 
 
+# The language server machinery, static loading, refactoring and validation,
+# is imported on first use. Execution only runs never need it.
 def process_validate_step_request(request):
+    from getgauge.validator import validate_step
     return validate_step(request)
 
 
+def import_impls():
+    """ Import the step implementations, for requests answered from them ahead of an execution. """
+    reload_impls(get_step_impl_dirs())
+
+
 def process_step_name_request(request):
     response = StepNameResponse()
     info = registry.get_info_for(request.stepValue)
@@ -30,15 +38,17 @@ def process_step_name_request(request):
         else:
             response.stepName.append(info.step_text)
         response.fileName = info.file_name
-        response.span.start = info.span['start']
-        response.span.startChar = info.span['startChar']
-        response.span.end = info.span['end']
-        response.span.endChar = info.span['endChar']
+        span = info.span
+        response.span.start = span['start']
+        response.span.startChar = span['startChar']
+        response.span.end = span['end']
+        response.span.endChar = span['endChar']
     response.hasAlias = info.has_alias
     return response
 
 
 def process_refactor_request(request):
+    from getgauge.refactor import refactor_step
     response = RefactorResponse()
     try:
         refactor_step(request, response)
@@ -55,12 +65,15 @@ def process_step_names_request():
 
 
 def process_execute_step_request(request):
+    start_ns = time.perf_counter_ns()
     params = []
     for p in request.parameters:
         params.append(Table(p.table) if p.parameterType in [
             Parameter.Table, Parameter.Special_Table] else p.value)
     response = create_execution_status_response()
-    info = registry.get_info_for(request.parsedStepText)
+    info = _lookup(registry.get_info_for, request.parsedStepText)
+    if profiler.enabled:
+        profiler.record('arguments', info.step_text, time.perf_counter_ns() - start_ns)
     execute_method(params, info, response, registry.is_continue_on_failure)
     return response
 
@@ -71,13 +84,24 @@ def _add_message_and_screenshots(response):
         ScreenshotsStore.pending_screenshots())
 
 
+def _lookup(lookup, *args):
+    """
+    Look steps or hooks up under the read lock of the registry. Execution
+    requests only hold it for lookups, not while implementations run.
+    """
+    with registry.lock.read():
+        return lookup(*args)
+
+
 def process_execution_starting_request(request, clear=True):
     if clear:
-        registry.clear()
-        load_impls(get_step_impl_dirs())
+        with registry.lock.write():
+            reload_impls(get_step_impl_dirs())
+    ScreenshotsStore.forget_files()
+    profiler.start()
     execution_info = create_execution_context_from(
         request.currentExecutionInfo)
-    response = run_hook(request, registry.before_suite(), execution_info)
+    response = run_hook(request, _lookup(registry.before_suite), execution_info)
     _add_message_and_screenshots(response)
     return response
 
@@ -85,16 +109,16 @@ def process_execution_starting_request(request, clear=True):
 def process_execution_ending_request(request):
     execution_info = create_execution_context_from(
         request.currentExecutionInfo)
-    response = run_hook(request, registry.after_suite(), execution_info)
+    response = run_hook(request, _lookup(registry.after_suite), execution_info)
     _add_message_and_screenshots(response)
+    profiler.finish()
     return response
 
 
 def process_spec_execution_starting_request(request):
     execution_info = create_execution_context_from(
         request.currentExecutionInfo)
-    response = run_hook(request, registry.before_spec(
-        execution_info.specification.tags), execution_info)
+    response = run_hook(request, _lookup(registry.before_spec, execution_info.specification.tags), execution_info)
     _add_message_and_screenshots(response)
     return response
 
@@ -102,8 +126,7 @@ def process_spec_execution_starting_request(request):
 def process_spec_execution_ending_request(request):
     execution_info = create_execution_context_from(
         request.currentExecutionInfo)
-    response = run_hook(request, registry.after_spec(
-        execution_info.specification.tags), execution_info)
+    response = run_hook(request, _lookup(registry.after_spec, execution_info.specification.tags), execution_info)
     _add_message_and_screenshots(response)
     return response
 
@@ -113,40 +136,134 @@ def process_scenario_execution_starting_request(request):
         request.currentExecutionInfo)
     tags = list(execution_info.scenario.tags) + \
         list(execution_info.specification.tags)
-    response = run_hook(
-        request, registry.before_scenario(tags), execution_info)
+    _step_hooks[request.stream] = _resolve_step_hooks(tags)
+    response = run_hook(request, _lookup(registry.before_scenario, tags), execution_info)
     _add_message_and_screenshots(response)
     return response
 
 
 def process_scenario_execution_ending_request(request):
+    _step_hooks.pop(request.stream, None)
     execution_info = create_execution_context_from(
         request.currentExecutionInfo)
     tags = list(execution_info.scenario.tags) + \
         list(execution_info.specification.tags)
-    response = run_hook(request, registry.after_scenario(tags), execution_info)
+    response = run_hook(request, _lookup(registry.after_scenario, tags), execution_info)
     _add_message_and_screenshots(response)
     return response
 
 
-def process_step_execution_starting_request(request):
+# before_step and after_step hooks of the running scenario of each stream,
+# resolved once when the scenario starts and again only if hooks change.
+_step_hooks = {}
+_StepHooks = namedtuple('_StepHooks', 'version tags before after')
+
+
+def _resolve_step_hooks(tags):
+    with registry.lock.read():
+        return _StepHooks(registry.hooks_version, tags, registry.before_step(tags), registry.after_step(tags))
+
+
+def _get_step_hooks(request):
+    hooks = _step_hooks.get(request.stream)
+    if hooks is None:
+        info = request.currentExecutionInfo
+        return _resolve_step_hooks(list(info.currentScenario.tags) + list(info.currentSpec.tags))
+    if hooks.version != registry.hooks_version:
+        hooks = _step_hooks[request.stream] = _resolve_step_hooks(hooks.tags)
+    return hooks
+
+
+def _run_step_hooks(request, hooks):
+    # The execution context is only needed when there are hooks to run it with.
     execution_info = create_execution_context_from(
-        request.currentExecutionInfo)
-    tags = list(execution_info.scenario.tags) + \
-        list(execution_info.specification.tags)
-    response = run_hook(request, registry.before_step(tags), execution_info)
+        request.currentExecutionInfo) if hooks else None
+    response = run_hook(request, hooks, execution_info)
     _add_message_and_screenshots(response)
     return response
 
 
+def process_step_execution_starting_request(request):
+    return _run_step_hooks(request, _get_step_hooks(request).before)
+
+
 def process_step_execution_ending_request(request):
-    execution_info = create_execution_context_from(
-        request.currentExecutionInfo)
-    tags = list(execution_info.scenario.tags) + \
-        list(execution_info.specification.tags)
-    response = run_hook(request, registry.after_step(tags), execution_info)
-    _add_message_and_screenshots(response)
-    return response
+    return _run_step_hooks(request, _get_step_hooks(request).after)
+
+
+def process_execute_steps_request(requests):
+    """
+    Process StepExecutionStarting, ExecuteStep and StepExecutionEnding requests
+    of consecutive steps, wrapped in Messages, in order. Returns one response
+    per processed request. Once a request fails without being recoverable, or
+    skips the scenario, only the StepExecutionEnding request of that step is
+    processed before stopping.
+    """
+    return list(iter_execute_steps_request(requests))
+
+
+def iter_execute_steps_request(requests):
+    """ Like process_execute_steps_request, yielding each response once its request is processed. """
+    failed = False
+    for message in requests:
+        if message.messageType == Message.StepExecutionEnding:
+            response = process_step_execution_ending_request(message.stepExecutionEndingRequest)
+        elif failed:
+            continue
+        elif message.messageType == Message.StepExecutionStarting:
+            response = process_step_execution_starting_request(message.stepExecutionStartingRequest)
+        elif message.messageType == Message.ExecuteStep:
+            response = process_execute_step_request(message.executeStepRequest)
+        else:
+            raise ValueError('Unsupported message type {} in a batch of steps'.format(
+                Message.MessageType.Name(message.messageType)))
+        yield response
+        failed = failed or _stops_scenario(response.executionResult)
+        if failed and message.messageType == Message.StepExecutionEnding:
+            break
+
+
+def _stops_scenario(result):
+    return (result.failed and not result.recoverableError) or result.skipScenario
+
+
+def process_streamed(process, args, send):
+    """
+    Process a request, sending the messages and screenshots written meanwhile
+    through send as they come, each in an ExecutionStatusResponse of its own,
+    followed by the response, or every response yielded, of process.
+    """
+    def send_message(message):
+        response = ExecutionStatusResponse()
+        response.executionResult.message.append(message)
+        send(response)
+
+    def send_screenshot(screenshot):
+        response = ExecutionStatusResponse()
+        response.executionResult.screenshotFiles.append(screenshot)
+        send(response)
+
+    sinks = MessagesStore.set_sink(send_message), ScreenshotsStore.set_sink(send_screenshot)
+    try:
+        result = process(*args)
+        for response in [result] if isinstance(result, ExecutionStatusResponse) else result:
+            # Screenshots are sent as their files are written, before the response.
+            ScreenshotsStore.wait_for_writes()
+            send(response)
+    finally:
+        ScreenshotsStore.wait_for_writes()
+        MessagesStore.set_sink(sinks[0])
+        ScreenshotsStore.set_sink(sinks[1])
+
+
+def bind_stream():
+    """
+    Give the calling thread, which executes the requests of one parallel
+    stream, scenario and spec data stores, messages and screenshots of its own.
+    """
+    data_store.bind()
+    MessagesStore.bind()
+    ScreenshotsStore.bind()
 
 
 def process_scenario_data_store_init_request():
@@ -164,23 +281,34 @@ def process_suite_data_store_init_request():
     return create_execution_status_response()
 
 
-def _load_from_disk(file_path):
-    if path.isfile(file_path):
-        reload_steps(file_path)
+def process_cache_file_request(request):
+    return apply_cache_file_request(request, parse_cache_file_request(request))
 
 
-def process_cache_file_request(request):
+def parse_cache_file_request(request):
+    """
+    Parse the file of a CacheFile request, which needs no registry lock.
+    Returns None when there is nothing to parse, or the file does not parse.
+    """
+    from getgauge.parser import Parser
     file = request.filePath
     status = request.status
     if status in [CacheFileRequest.CHANGED, CacheFileRequest.OPENED]:
-        reload_steps(file, request.content)
-    elif status == CacheFileRequest.CREATED:
-        if not registry.is_file_cached(file):
-            _load_from_disk(file)
-    elif status == CacheFileRequest.CLOSED:
-        _load_from_disk(file)
-    else:
+        return Parser.parse(file, request.content)
+    if status in [CacheFileRequest.CREATED, CacheFileRequest.CLOSED] and path.isfile(file):
+        return Parser.parse(file)
+    return None
+
+
+def apply_cache_file_request(request, parsed):
+    """ Swap the steps of the file of a CacheFile request for those parse_cache_file_request parsed. """
+    from getgauge.static_loader import replace_steps
+    file = request.filePath
+    status = request.status
+    if status == CacheFileRequest.DELETED:
         registry.remove_steps(file)
+    elif parsed and (status != CacheFileRequest.CREATED or not registry.is_file_cached(file)):
+        replace_steps(parsed)
     return Empty()
 
 
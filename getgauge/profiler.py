@@ -0,0 +1,122 @@
+"""
+Timings of step and hook implementations, for finding out whether a slow
+suite is slow in its own code or in the runner.
+
+With GAUGE_PYTHON_PROFILE, an execution records how long every step and hook
+implementation took, by step text or hook and tag expression, along with the
+time spent building the arguments of steps, like tables, and the time the
+runner spent on each kind of request besides running implementations. When
+the execution finishes, the timings are written to python-profile-<pid>.json
+and .csv in the reports directory, and the slowest entries are logged.
+"""
+import csv
+import json
+import os
+import threading
+import time
+
+from getgauge import logger
+from getgauge.util import get_project_root, use_profiler
+
+TOP = 10
+COLUMNS = ('category', 'name', 'count', 'total_ns', 'mean_ns', 'min_ns', 'max_ns')
+# Hooks run for a request, by the name of its type.
+_HOOKS = {
+    'ExecutionStartingRequest': 'before_suite', 'ExecutionEndingRequest': 'after_suite',
+    'SpecExecutionStartingRequest': 'before_spec', 'SpecExecutionEndingRequest': 'after_spec',
+    'ScenarioExecutionStartingRequest': 'before_scenario', 'ScenarioExecutionEndingRequest': 'after_scenario',
+    'StepExecutionStartingRequest': 'before_step', 'StepExecutionEndingRequest': 'after_step',
+}
+
+enabled = False
+# Count, total, min and max nanoseconds by category and name.
+_entries, _entries_lock = {}, threading.Lock()
+# Nanoseconds spent in implementations by the request running on each thread.
+_local = threading.local()
+
+
+def start():
+    """ Start recording timings if GAUGE_PYTHON_PROFILE is set, as an execution starts. """
+    global enabled
+    enabled = use_profiler()
+    with _entries_lock:
+        _entries.clear()
+
+
+def finish():
+    """ Write the timings of the execution to the report files and log the slowest entries. """
+    global enabled
+    if not enabled:
+        return
+    enabled = False
+    entries = report()
+    base = os.path.join(get_project_root(), os.getenv('gauge_reports_dir', 'reports'),
+                        'python-profile-{0}'.format(os.getpid()))
+    try:
+        os.makedirs(os.path.dirname(base), exist_ok=True)
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(entries, f, indent=2)
+        with open(base + '.csv', 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, COLUMNS)
+            writer.writeheader()
+            writer.writerows(entries)
+    except OSError as err:
+        logger.error('Failed to write the profile to {0}.\n{1}', base, err)
+    else:
+        logger.info('Profile written to {0}.json and {0}.csv', base)
+    if entries:
+        logger.info('Slowest {0} of {1} profile entries, by total time:', min(TOP, len(entries)), len(entries))
+    for entry in entries[:TOP]:
+        logger.info('{0:>12.3f} ms in {1:>6} calls  {2} {3}', entry['total_ns'] / 1e6, entry['count'],
+                    entry['category'], entry['name'])
+
+
+def report():
+    """ Timings recorded so far, slowest in total first. """
+    with _entries_lock:
+        entries = [dict(zip(COLUMNS, (category, name, count, total, total // count, low, high)))
+                   for (category, name), (count, total, low, high) in _entries.items()]
+    return sorted(entries, key=lambda entry: entry['total_ns'], reverse=True)
+
+
+def hook_kind(request):
+    """ The kind of hooks run for request. """
+    return _HOOKS.get(type(request).__name__, 'hook')
+
+
+def record_implementation(info, kind, elapsed):
+    """ Record elapsed nanoseconds spent in the implementation of a step, or of a hook of the given kind. """
+    if kind is None:
+        record('step', info.step_text, elapsed)
+    else:
+        name = getattr(info.impl, '__qualname__', str(info.impl))
+        record(kind, name if not info.tags else '{0} [{1}]'.format(name, info.tags), elapsed)
+    _local.implementations_ns = getattr(_local, 'implementations_ns', 0) + elapsed
+
+
+def record(category, name, elapsed):
+    key = category, name
+    with _entries_lock:
+        entry = _entries.get(key)
+        if entry is None:
+            _entries[key] = [1, elapsed, elapsed, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+            entry[2] = min(entry[2], elapsed)
+            entry[3] = max(entry[3], elapsed)
+
+
+def call(process, *args):
+    """ Call process, recording the time it took besides running implementations as runner time. """
+    if not enabled:
+        return process(*args)
+    implementations_ns = getattr(_local, 'implementations_ns', 0)
+    start_ns = time.perf_counter_ns()
+    try:
+        return process(*args)
+    finally:
+        elapsed = time.perf_counter_ns() - start_ns
+        if enabled:
+            spent = getattr(_local, 'implementations_ns', 0) - implementations_ns
+            record('runner', process.__name__, elapsed - spent)
@@ -1,3 +1,5 @@
+import contextvars
+import functools
 import sys
 import warnings
 from getgauge.registry import registry, MessagesStore, ScreenshotsStore
@@ -14,13 +16,13 @@ def step(step_text):
         span = {'start': f_code.co_firstlineno,
                 'startChar': 0, 'end': 0, 'endChar': 0}
         registry.add_step(step_text, func, f_code.co_filename, span)
-        return func
+        return _mark(func)
 
     return _step
 
 
 def continue_on_failure(obj):
-    return _define_wrapper(obj, registry.continue_on_failure)
+    return _define_wrapper(obj, registry.continue_on_failure, mark=False)
 
 
 def before_suite(obj=None):
@@ -58,13 +60,13 @@ def after_step(obj=None):
 def screenshot(func):
     _warn_screenshot_deprecation('screenshot', 'custom_screenshot_writer')
     registry.set_screenshot_provider(func, False)
-    return func
+    return _mark(func)
 
 
 def custom_screen_grabber(func):
     _warn_screenshot_deprecation('custom_screen_grabber', 'custom_screenshot_writer')
     registry.set_screenshot_provider(func, False)
-    return func
+    return _mark(func)
 
 
 def custom_screenshot_writer(func):
@@ -72,6 +74,23 @@ def custom_screenshot_writer(func):
     return func
 
 
+def with_current_context(func):
+    """
+    Wrap func to run in a copy of the current context, for the threads a step
+    starts, as in threading.Thread(target=with_current_context(work)). The
+    messages, screenshots and data stores of the thread are then those of the
+    step, even when scenarios run in parallel streams. Threads started
+    otherwise report their messages and screenshots with the next request
+    which does not run in a stream, at the latest with the suite hooks.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return run
+
+
 def _warn_screenshot_deprecation(old_function, new_function):
     warnings.warn(
         "'{0}' is deprecated in favour of '{1}'".format(old_function, new_function),
@@ -268,14 +287,21 @@ class DataStoreContainer(object):
         self.__scenario = DictObject()
         self.__spec = DictObject()
         self.__suite = DictObject()
+        self.__bound = contextvars.ContextVar('data_stores', default=None)
+
+    def bind(self):
+        """ Give the current context, and contexts copied from it, scenario and spec data stores of their own. """
+        self.__bound.set((DictObject(), DictObject()))
 
     @property
     def scenario(self):
-        return self.__scenario
+        bound = self.__bound.get()
+        return self.__scenario if bound is None else bound[0]
 
     @property
     def spec(self):
-        return self.__spec
+        bound = self.__bound.get()
+        return self.__spec if bound is None else bound[1]
 
     @property
     def suite(self):
@@ -351,18 +377,36 @@ def _wrapper(*args, **kwargs):
     pass
 
 
-def _define_wrapper(obj, callback):
+def _define_wrapper(obj, callback, mark=True):
     if hasattr(obj, '__call__'):
         callback(obj, None)
-        return obj
+        return _mark(obj) if mark else obj
 
     def func(function):
         callback(function, obj)
-        return function
+        return _mark(function) if mark else function
 
     return func
 
 
+# Functions given to the decorators are tagged, so that the loader tells the
+# classes implementing steps and hooks without reading their source.
+_IMPLEMENTATION_MARKER = '_gauge_implementation'
+
+
+def _mark(func):
+    try:
+        setattr(func, _IMPLEMENTATION_MARKER, True)
+    except (AttributeError, TypeError):
+        pass
+    return func
+
+
+def _is_marked(member):
+    """ Whether a class member was given to a step, hook or screenshot decorator. """
+    return getattr(getattr(member, '__func__', member), _IMPLEMENTATION_MARKER, False) is True
+
+
 class Screenshots:
     @staticmethod
     def capture_screenshot():
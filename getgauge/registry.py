@@ -1,21 +1,32 @@
+import ast
+import contextvars
 import inspect
 import os
 import re
-import sys
-from subprocess import call
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import Future
 from uuid import uuid1
 
-from getgauge import logger
+from getgauge import logger, screenshots
+from getgauge.rwlock import ReadWriteLock
+from getgauge.util import get_messages_limit
 
 
 class StepInfo(object):
+    # Large projects keep thousands of these alive in the language server,
+    # so they are slotted and keep their span as a tuple of four ints until
+    # it is first asked for.
+    __slots__ = ('__step_text', '__parsed_step_text', '__impl', '__file_name', '__span',
+                 '__has_alias', '__instance', '__aliases', '__args_length')
+
     def __init__(self, step_text, parsed_step_text, impl, file_name, span, has_alias=False, aliases=None):
-        if aliases is None:
-            aliases = []
         self.__step_text, self.__parsed_step_text, self.__impl = step_text, parsed_step_text, impl
-        self.__file_name, self.__span, self.__has_alias = file_name, span, has_alias
+        self.__file_name, self.__span, self.__has_alias = file_name, _compact_span(span), has_alias
         self.__instance = None
         self.__aliases = aliases
+        self.__args_length = None
 
     @property
     def step_text(self):
@@ -43,7 +54,7 @@ class StepInfo(object):
 
     @property
     def aliases(self):
-        return self.__aliases
+        return self.__aliases if self.__aliases is not None else []
 
     @property
     def file_name(self):
@@ -54,13 +65,26 @@ class StepInfo(object):
         # If span is callable, lazy load span on access
         if callable(self.__span):
             self.__span = self.__span()
+        if isinstance(self.__span, tuple):
+            # Expanded once, only the infos asked about hold a dict.
+            self.__span = dict(zip(_SPAN_KEYS, self.__span))
         return self.__span
 
+    @property
+    def args_length(self):
+        if self.__args_length is None:
+            self.__args_length = _args_length(self.__impl)
+        return self.__args_length
+
 
 class HookInfo(object):
+    __slots__ = ('__tags', '__impl', '__file_name', '__instance', '__matches', '__args_length')
+
     def __init__(self, tags, impl, file_name):
         self.__tags, self.__impl, self.__file_name = tags, impl, file_name
         self.__instance = None
+        self.__matches = _compile_tag_expression(tags)
+        self.__args_length = None
 
     @property
     def tags(self):
@@ -82,23 +106,140 @@ class HookInfo(object):
     def instance(self, value):
         self.__instance = value
 
+    @property
+    def args_length(self):
+        if self.__args_length is None:
+            self.__args_length = _args_length(self.__impl)
+        return self.__args_length
+
+    def matches(self, tags):
+        """ Whether the hook applies to a spec or scenario with the given frozenset of tags. """
+        return self.__matches(tags)
+
+
+class _PendingMessages(object):
+    """
+    Messages written since the last report, by one or several threads of a
+    step. Past limit bytes, messages are spilled to a temporary file, or
+    dropped if it cannot be written, and reported as a single summary message.
+    """
+    __slots__ = ('messages', 'lock', 'size', 'limit', 'spill', 'spilled_messages', 'spilled_bytes',
+                 'dropped_messages', 'dropped_bytes')
+
+    def __init__(self):
+        self.messages, self.lock = deque(), threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.size, self.limit, self.spill = 0, None, None
+        self.spilled_messages = self.spilled_bytes = self.dropped_messages = self.dropped_bytes = 0
+
+    def append(self, message):
+        size = len(message.encode('utf-8', 'replace'))
+        with self.lock:
+            if self.limit is None:
+                self.limit = get_messages_limit()
+            if not self.limit or self.size + size <= self.limit:
+                self.messages.append(message)
+                self.size += size
+                return
+            try:
+                if self.spill is None:
+                    self.spill = tempfile.NamedTemporaryFile(
+                        'w', encoding='utf-8', errors='replace', prefix='gauge-messages-', suffix='.log', delete=False)
+                self.spill.write(message + '\n')
+                self.spilled_messages += 1
+                self.spilled_bytes += size
+            except OSError as err:
+                if not self.dropped_messages:
+                    logger.warning('Failed to spill step messages to a file, dropping them.\n{0}'.format(err))
+                self.dropped_messages += 1
+                self.dropped_bytes += size
+
+    def report(self):
+        with self.lock:
+            messages = _drain(self.messages)
+            if self.spill is not None:
+                self.spill.close()
+                messages.append('{0} more messages ({1} bytes) past the limit of {2} bytes were written to {3}'.format(
+                    self.spilled_messages, self.spilled_bytes, self.limit, self.spill.name))
+            if self.dropped_messages:
+                messages.append('{0} more messages ({1} bytes) past the limit of {2} bytes were dropped'.format(
+                    self.dropped_messages, self.dropped_bytes, self.limit))
+            with _message_counters_lock:
+                for name in _message_counters:
+                    _message_counters[name] += getattr(self, name)
+            self._reset()
+        return messages
+
+
+def _drain(items):
+    drained = []
+    try:
+        while True:
+            drained.append(items.popleft())
+    except IndexError:
+        return drained
+
+
+_message_counters = dict.fromkeys(('spilled_messages', 'spilled_bytes', 'dropped_messages', 'dropped_bytes'), 0)
+_message_counters_lock = threading.Lock()
+_messages = contextvars.ContextVar('messages', default=None)
+_messages_sink = contextvars.ContextVar('messages_sink', default=None)
+
 
 class MessagesStore:
-    __messages = []
+    """
+    Messages written by step and hook implementations, pending until they are
+    reported. With GAUGE_PYTHON_MESSAGES_LIMIT set, at most that many bytes
+    are kept in memory in between, the rest spills to a temporary file.
+
+    A context can bind pending messages of its own, which the asyncio tasks
+    and contexts copied from it share, like the threads of a step which run
+    with_current_context. Other contexts, like threads started by a step
+    otherwise, write to process wide pending messages. These are only reported
+    by contexts binding nothing, so that parallel streams, which bind pending
+    messages of their own, do not report the output of one another.
+    """
+    __shared = _PendingMessages()
+
+    @staticmethod
+    def bind():
+        """ Keep the messages of the current context, and contexts copied from it, apart from others. """
+        _messages.set(_PendingMessages())
 
     @staticmethod
     def pending_messages():
-        messages = MessagesStore.__messages
-        MessagesStore.__messages = []
-        return messages
+        bound = _messages.get()
+        return (bound if bound is not None else MessagesStore.__shared).report()
 
     @staticmethod
     def write_message(message):
-        MessagesStore.__messages.append(str(message))
+        sink = _messages_sink.get()
+        if sink is not None:
+            sink(str(message))
+            return
+        (_messages.get() or MessagesStore.__shared).append(str(message))
+
+    @staticmethod
+    def counters():
+        """ Messages and bytes spilled to files or dropped so far, over the limit of their step. """
+        with _message_counters_lock:
+            return dict(_message_counters)
+
+    @staticmethod
+    def set_sink(sink):
+        """
+        Hand messages written in the current context to sink instead of keeping
+        them pending. Returns the previous sink.
+        """
+        previous = _messages_sink.get()
+        _messages_sink.set(sink)
+        return previous
 
     @staticmethod
     def clear():
-        MessagesStore.__messages = []
+        MessagesStore.pending_messages()
 
 
 class Registry(object):
@@ -106,31 +247,55 @@ class Registry(object):
              'before_suite', 'after_suite']
 
     def __init__(self):
-        self.__screenshot_provider, self.__steps_map, self.__continue_on_failures = _take_screenshot, {}, {}
-        self.is_screenshot_writer = True
+        self.__screenshot_provider, self.__steps_map, self.__continue_on_failures = screenshots.capture, {}, {}
+        # Steps, hooks and continue_on_failure functions by normalized file
+        # path, so that file based lookups do not have to go through every
+        # registered step.
+        self.__file_steps, self.__file_hooks, self.__file_continue_on_failures = {}, {}, {}
+        # Hooks applicable to a set of tags, by hook name and frozenset of tags.
+        self.__filtered_hooks = {}
+        self.__hooks_version = 0
+        self.is_screenshot_writer = False
+        # Shared by readers of the steps and hooks, held alone by requests
+        # changing them.
+        self.lock = ReadWriteLock()
         for hook in Registry.hooks:
             self.__def_hook(hook)
 
     def __def_hook(self, hook):
         def get(self, tags=None):
-            return _filter_hooks(tags, getattr(self, '__{}'.format(hook)))
+            key = (hook, frozenset(tags or ()))
+            hooks = self.__filtered_hooks.get(key)
+            if hooks is None:
+                hooks = _filter_hooks(key[1], getattr(self, '__{}'.format(hook)))
+                self.__filtered_hooks[key] = hooks
+            return hooks
 
         def add(self, func=None, tags=None, file_name=""):
             if not isinstance(func, str):
                 file_name = inspect.getsourcefile(func)
-            getattr(self, '__{}'.format(hook)).append(
-                HookInfo(tags, func, file_name))
+            info = HookInfo(tags, func, file_name)
+            getattr(self, '__{}'.format(hook)).append(info)
+            self.__file_hooks.setdefault(_path_key(file_name), []).append(info)
+            self.__filtered_hooks = {}
+            self.__hooks_version += 1
 
         setattr(self.__class__, hook, get)
         setattr(self.__class__, 'add_{}'.format(hook), add)
         setattr(self, '__{}'.format(hook), [])
 
+    @property
+    def hooks_version(self):
+        """ Changes whenever a hook is added or the registry is cleared. """
+        return self.__hooks_version
+
     def add_step(self, step_text, func, file_name, span=None, has_alias=False, aliases=None):
         if not isinstance(step_text, list):
             parsed_step_text = _get_step_value(step_text)
             info = StepInfo(step_text, parsed_step_text, func,
                             file_name, span, has_alias, aliases)
             self.__steps_map.setdefault(parsed_step_text, []).append(info)
+            self.__file_steps.setdefault(_path_key(file_name), []).append(info)
             return
         for text in step_text:
             self.add_step(text, func, file_name, span, True, step_text)
@@ -160,6 +325,12 @@ class Registry(object):
 
     def continue_on_failure(self, func, exceptions=None):
         self.__continue_on_failures[func] = exceptions or [AssertionError]
+        try:
+            file_name = inspect.getsourcefile(func)
+        except TypeError:
+            file_name = None
+        if file_name is not None:
+            self.__file_continue_on_failures.setdefault(_path_key(file_name), []).append(func)
 
     def is_continue_on_failure(self, func, exception):
         if func in self.__continue_on_failures:
@@ -169,122 +340,275 @@ class Registry(object):
         return False
 
     def get_step_positions(self, file_name):
-        positions = []
-        for step, infos in self.__steps_map.items():
-            positions.extend(
-                [{'stepValue': step, 'span': i.span} for i in infos if paths_equal(i.file_name, file_name)]
-            )
-        return positions
+        return [{'stepValue': i.parsed_step_text, 'span': i.span}
+                for i in self.__file_steps.get(_path_key(file_name), [])]
 
     def _get_all_hooks(self, file_name):
-        all_hooks = []
-        for hook in self.hooks:
-            all_hooks.extend(
-                [h for h in getattr(self, "__{}".format(hook)) if paths_equal(h.file_name, file_name)]
-            )
-        return all_hooks
+        return list(self.__file_hooks.get(_path_key(file_name), []))
 
     def get_all_methods_in(self, file_name):
-        methods = []
-        for _, infos in self.__steps_map.items():
-            methods.extend(
-                [i for i in infos if paths_equal(i.file_name, file_name)]
-            )
-        return methods + self._get_all_hooks(file_name)
+        return list(self.__file_steps.get(_path_key(file_name), [])) + self._get_all_hooks(file_name)
 
     def is_file_cached(self, file_name):
-        for _, infos in self.__steps_map.items():
-            if any(paths_equal(i.file_name, file_name) for i in infos):
-                return True
-        return False
+        return _path_key(file_name) in self.__file_steps
 
     def remove_steps(self, file_name):
-        new_map = {}
-        for step, infos in self.__steps_map.items():
-            filtered_info = [i for i in infos if not paths_equal(i.file_name, file_name)]
-            if len(filtered_info) > 0:
-                new_map[step] = filtered_info
-        self.__steps_map = new_map
+        for info in self.__file_steps.pop(_path_key(file_name), []):
+            infos = self.__steps_map[info.parsed_step_text]
+            infos.remove(info)
+            if len(infos) == 0:
+                del self.__steps_map[info.parsed_step_text]
+
+    def remove_file(self, file_name):
+        """ Remove the steps, hooks and continue_on_failure functions of a file. """
+        self.remove_steps(file_name)
+        for func in self.__file_continue_on_failures.pop(_path_key(file_name), []):
+            self.__continue_on_failures.pop(func, None)
+        hooks = self.__file_hooks.pop(_path_key(file_name), [])
+        if not hooks:
+            return
+        for hook in Registry.hooks:
+            infos = getattr(self, '__{}'.format(hook))
+            setattr(self, '__{}'.format(hook), [info for info in infos if info not in hooks])
+        self.__filtered_hooks = {}
+        self.__hooks_version += 1
 
     def clear(self):
-        self.__steps_map, self.__continue_on_failures = {}, {}
+        self.__steps_map, self.__continue_on_failures, self.__file_continue_on_failures = {}, {}, {}
+        self.__file_steps, self.__file_hooks, self.__filtered_hooks = {}, {}, {}
+        self.__hooks_version += 1
         for hook in Registry.hooks:
             setattr(self, '__{}'.format(hook), [])
 
 
 def paths_equal(first_file_path, second_file_path):
     """ Normalize paths in order to compare them. """
-    return os.path.normcase(str(first_file_path)) == os.path.normcase(str(second_file_path))
+    return _path_key(first_file_path) == _path_key(second_file_path)
+
+
+def _path_key(file_name):
+    return os.path.normcase(str(file_name))
 
 
 def _filter_hooks(tags, hooks):
-    filtered_hooks = []
-    for hook in hooks:
-        hook_tags = hook.tags
-        if hook_tags is None:
-            filtered_hooks.append(hook)
-            continue
-        for tag in tags:
-            hook_tags = hook_tags.replace('<{}>'.format(tag), 'True')
-        if eval(re.sub(r'<[^<]+?>', 'False', hook_tags)):
-            filtered_hooks.append(hook)
-    return filtered_hooks
+    return [hook for hook in hooks if hook.matches(tags)]
 
 
-def _get_step_value(step_text):
-    return re.sub(r'(<.*?>)', '{}', step_text)
+def _compile_tag_expression(expression):
+    """
+    Compile a hook tag expression such as `<a> and (<b> or not <c>)` into a
+    predicate over a frozenset of tags. A hook without tags always matches. An
+    invalid expression fails when the hook is looked up, not when registered.
+    """
+    if expression is None:
+        return lambda tags: True
+    names = {}
 
+    def placeholder(match):
+        name = '_tag{}'.format(len(names))
+        names[name] = match.group(0)[1:-1]
+        return ' {} '.format(name)
 
-def _take_screenshot():
-    temp_file = _unique_screenshot_file()
     try:
-        call(['gauge_screenshot', temp_file])
-        return os.path.basename(temp_file)
-    except Exception as err:
-        logger.error(
-            "\nFailed to take screenshot using gauge_screenshot.\n{0}".format(err))
-    except:
-        logger.error("\nFailed to take screenshot using gauge_screenshot.\n{0}".format(
-            sys.exc_info()[0]))
-    return ""
+        source = re.sub(r'<[^<]+?>', placeholder, expression)
+        return _compile_tag_node(ast.parse(source.strip(), mode='eval').body, names)
+    except (SyntaxError, ValueError) as ex:
+        error = ValueError("Invalid tag expression '{}': {}".format(expression, ex))
+
+        def invalid(tags):
+            raise error
+
+        return invalid
+
+
+def _compile_tag_node(node, names):
+    if isinstance(node, ast.Name) and node.id in names:
+        tag = names[node.id]
+        return lambda tags: tag in tags
+    if isinstance(node, ast.Constant) and isinstance(node.value, bool):
+        value = node.value
+        return lambda tags: value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _compile_tag_node(node.operand, names)
+        return lambda tags: not operand(tags)
+    if isinstance(node, ast.BoolOp):
+        operands = [_compile_tag_node(value, names) for value in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda tags: all(operand(tags) for operand in operands)
+        return lambda tags: any(operand(tags) for operand in operands)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, (ast.BitAnd, ast.BitOr)):
+        left, right = _compile_tag_node(node.left, names), _compile_tag_node(node.right, names)
+        if isinstance(node.op, ast.BitAnd):
+            return lambda tags: left(tags) and right(tags)
+        return lambda tags: left(tags) or right(tags)
+    raise ValueError("unsupported {}".format(type(node).__name__))
+
+
+_SPAN_KEYS = ('start', 'startChar', 'end', 'endChar')
+
+
+def _compact_span(span):
+    """ Store a complete span dict as a (start, startChar, end, endChar) tuple. """
+    if isinstance(span, dict) and len(span) == len(_SPAN_KEYS) and \
+            all(type(span.get(key)) is int for key in _SPAN_KEYS):
+        return tuple(span[key] for key in _SPAN_KEYS)
+    return span
+
+
+def _args_length(impl):
+    """ Number of parameters of a step or hook implementation, computed once per info. """
+    return len(inspect.signature(impl).parameters)
+
+
+def _get_step_value(step_text):
+    return re.sub(r'(<.*?>)', '{}', step_text)
 
 
 registry = Registry()
 
 
+_screenshots = contextvars.ContextVar('screenshots', default=None)
+_screenshots_sink = contextvars.ContextVar('screenshots_sink', default=None)
+_screenshot_writes = contextvars.ContextVar('screenshot_writes', default=None)
+
+
 class ScreenshotsStore:
-    __screenshots = []
+    """
+    Screenshots captured by step and hook implementations, pending until they
+    are reported. Contexts bind pending screenshots as with MessagesStore.
+
+    Unless the screenshot provider writes files itself, screenshot files are
+    written in the background, and only waited for once they are reported.
+    Screenshots identical to one written before are then reported with the
+    name of its file.
+    """
+    __shared = deque()
+    __shared_writes = deque()
+
+    @staticmethod
+    def bind():
+        """ Keep the screenshots of the current context, and contexts copied from it, apart from others. """
+        _screenshots.set(deque())
+        _screenshot_writes.set(deque())
 
     @staticmethod
     def pending_screenshots():
-        screenshots = ScreenshotsStore.__screenshots
-        ScreenshotsStore.__screenshots = []
-        return screenshots
+        ScreenshotsStore.wait_for_writes()
+        bound = _screenshots.get()
+        return [_written_name(*pending) for pending in _drain(bound if bound is not None else ScreenshotsStore.__shared)]
+
+    @staticmethod
+    def wait_for_writes():
+        """ Wait until the screenshot files captured in the current context are written. """
+        bound = _screenshot_writes.get()
+        screenshots.wait(_drain(bound if bound is not None else ScreenshotsStore.__shared_writes))
+
+    @staticmethod
+    def set_capture_backend(backend):
+        """
+        Capture screenshots with backend, a callable returning PNG bytes or an
+        image with a save(file, format) method, unless step implementations
+        provide screenshots themselves. Returns the previous backend.
+        """
+        return screenshots.set_backend(backend)
+
+    @staticmethod
+    def forget_files():
+        """ Write screenshots identical to those captured so far to files of their own from now on. """
+        screenshots.forget_files()
+
+    @staticmethod
+    def timings():
+        """ Screenshots captured and written so far, with the nanoseconds these took. """
+        return screenshots.timings()
 
     @staticmethod
     def capture():
-        screenshot = ScreenshotsStore.capture_to_file()
-        ScreenshotsStore.__screenshots.append(screenshot)
+        sink = _screenshots_sink.get()
+        screenshot, write = ScreenshotsStore.__capture(False)
+        if sink is None:
+            bound = _screenshots.get()
+            (bound if bound is not None else ScreenshotsStore.__shared).append((screenshot, write))
+        elif write is None:
+            sink(screenshot)
+        else:
+            # Hand the file over once written, without holding up the step.
+            write = screenshots.when_written(write, lambda write: sink(_written_name(screenshot, write)))
+        if write is not None:
+            ScreenshotsStore.__add_write(write)
+
+    @staticmethod
+    def set_sink(sink):
+        """
+        Hand screenshots captured in the current context to sink instead of
+        keeping them pending, each once its file is written, on the thread
+        writing it. Returns the previous sink.
+        """
+        previous = _screenshots_sink.get()
+        _screenshots_sink.set(sink)
+        return previous
 
     @staticmethod
     def capture_to_file():
+        """ Capture a screenshot, returning the name of its file right away. """
+        screenshot, write = ScreenshotsStore.__capture(True)
+        if write is not None:
+            ScreenshotsStore.__add_write(write)
+        return screenshot
+
+    @staticmethod
+    def capture_file():
+        """
+        Like capture_to_file, but returns a future of the name of the file,
+        that of an identical screenshot written before if any, which is done
+        once the file is written.
+        """
+        screenshot, write = ScreenshotsStore.__capture(False)
+        name = Future()
+        if write is None:
+            name.set_result(screenshot)
+            return name
+        write.add_done_callback(lambda write: name.set_result(_written_name(screenshot, write)))
+        ScreenshotsStore.__add_write(write)
+        return name
+
+    @staticmethod
+    def __capture(link):
+        """
+        Capture a screenshot, returning the name of its file and the future of
+        its write, if any. With link, the file gets that name even when an
+        identical screenshot was written before.
+        """
         if not registry.is_screenshot_writer:
+            content, capture_ns = screenshots.timed_capture(registry.screenshot_provider())
+            if content is None:
+                return "", None
             screenshot_file = _unique_screenshot_file()
-            content = registry.screenshot_provider()()
-            with open(screenshot_file, "wb") as file:
-                file.write(content)
-            return os.path.basename(screenshot_file)
-        screenshot_file = registry.screenshot_provider()()
+            write = screenshots.write_once(screenshot_file, content, capture_ns, link)
+            return os.path.basename(screenshot_file), write
+        screenshot_file, _ = screenshots.timed_capture(registry.screenshot_provider())
         if not os.path.isabs(screenshot_file):
             screenshot_file = os.path.join(_screenshots_dir(), screenshot_file)
         if not os.path.exists(screenshot_file):
             logger.warning(
                 "Screenshot file {0} does not exists.".format(screenshot_file))
-        return os.path.basename(screenshot_file)
+        return os.path.basename(screenshot_file), None
+
+    @staticmethod
+    def __add_write(write):
+        bound = _screenshot_writes.get()
+        (bound if bound is not None else ScreenshotsStore.__shared_writes).append(write)
 
     @staticmethod
     def clear():
-        ScreenshotsStore.__screenshots = []
+        ScreenshotsStore.pending_screenshots()
+
+
+def _written_name(screenshot, write):
+    """ Name of the file a screenshot was written to, which may be that of an identical one. """
+    if write is None or write.exception() is not None:
+        return screenshot
+    return os.path.basename(write.result())
 
 
 def _unique_screenshot_file():
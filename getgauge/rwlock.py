@@ -0,0 +1,45 @@
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock(object):
+    """
+    Lock which is either shared by any number of readers or held by a single
+    writer. Waiting writers keep new readers out so they are not starved.
+    The lock is not reentrant.
+    """
+
+    def __init__(self):
+        self.__condition = threading.Condition(threading.Lock())
+        self.__readers = 0
+        self.__writing = False
+        self.__waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self.__condition:
+            while self.__writing or self.__waiting_writers:
+                self.__condition.wait()
+            self.__readers += 1
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__readers -= 1
+                if self.__readers == 0:
+                    self.__condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self.__condition:
+            self.__waiting_writers += 1
+            while self.__writing or self.__readers:
+                self.__condition.wait()
+            self.__waiting_writers -= 1
+            self.__writing = True
+        try:
+            yield
+        finally:
+            with self.__condition:
+                self.__writing = False
+                self.__condition.notify_all()
@@ -0,0 +1,341 @@
+"""
+Capturing screenshots and writing them to files.
+
+A capture backend is a callable returning the content of a screenshot: the
+bytes of a PNG image, or an image with a save(file, format) method, like a
+Pillow image, which is only encoded when it is written. The default backend
+grabs the screen in process with Pillow when it is installed, and falls back
+to running gauge_screenshot otherwise.
+
+Files are written on a background thread, so that the step which captured a
+screenshot goes on right away. At most GAUGE_PYTHON_SCREENSHOT_QUEUE
+screenshots wait to be written, further captures wait for the writer to catch
+up, which bounds the memory held by captured images. Timings of captures and
+writes are kept for the whole run.
+
+A screenshot identical to one already written during the execution, as when
+a stuck UI fails step after step, is not encoded and written again, but
+reported with the file of that one. Screenshots are compared on the writer
+thread, so the name of their file is only known once written; a screenshot
+whose name is handed out before gets a hard link to that file instead. With
+GAUGE_PYTHON_SCREENSHOT_MAX_SIZE, larger screenshots are scaled down, and with
+GAUGE_PYTHON_SCREENSHOT_COLORS, their colors are reduced before they are
+written, both of which require Pillow.
+"""
+import hashlib
+import importlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from subprocess import call
+
+from getgauge import logger
+from getgauge.util import get_screenshot_colors, get_screenshot_max_size, get_screenshot_queue_size
+
+_timings = dict.fromkeys(('captures', 'capture_ns', 'max_capture_ns', 'writes', 'write_ns', 'max_write_ns',
+                          'failed_writes', 'blocked_writes', 'blocked_ns', 'wait_ns', 'reused_files'), 0)
+_timings_lock = threading.Lock()
+_writer, _writer_lock = None, threading.Lock()
+# Queue size and the semaphore of its free slots.
+_slots = (None, None)
+# Path of the screenshots written during the execution, by generation,
+# directory and digest of their content. Writes queued before the files were
+# forgotten keep the generation they were queued in.
+_files, _files_lock = {}, threading.Lock()
+_generation = 0
+_pillow = {}
+_pillow_warned = False
+
+
+def grab_screen():
+    """ Default capture backend. Returns None when the screen cannot be captured. """
+    image = _grab_with_pillow()
+    return image if image is not None else _run_gauge_screenshot()
+
+
+_backend = grab_screen
+
+
+def set_backend(backend):
+    """ Capture screenshots with backend from now on. Returns the previous backend. """
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+def capture():
+    """ Capture a screenshot with the current backend, this is the default screenshot provider. """
+    return _backend()
+
+
+def timed_capture(provider):
+    """ Call provider, recording how long it took. Returns its result and the time taken, in nanoseconds. """
+    start = time.perf_counter_ns()
+    content = provider()
+    elapsed = time.perf_counter_ns() - start
+    with _timings_lock:
+        _timings['captures'] += 1
+        _timings['capture_ns'] += elapsed
+        _timings['max_capture_ns'] = max(_timings['max_capture_ns'], elapsed)
+    return content, elapsed
+
+
+def write(file_path, content, capture_ns=0):
+    """
+    Write content to file_path on the writer thread, first waiting for a free
+    slot in the queue if it is full. Returns a future of the write, giving
+    file_path.
+    """
+    return _submit(file_path, content, capture_ns, None, False)
+
+
+def write_once(file_path, content, capture_ns=0, link=False):
+    """
+    Like write, but if the same content was written to the same directory
+    during the execution, nothing is written and the future gives the path of
+    that file instead. With link, file_path is linked to that file, for names
+    used before the write is done.
+    """
+    return _submit(file_path, content, capture_ns, _generation, link)
+
+
+def when_written(write, callback):
+    """
+    Call callback with the future write once it is done, on the thread which
+    did it. Returns a future of the write which is only done once callback
+    returned.
+    """
+    done = Future()
+
+    def finish(write):
+        try:
+            callback(write)
+        except Exception as err:
+            logger.error('Failed to report screenshot.\n{0}'.format(err))
+        error = write.exception()
+        if error is None:
+            done.set_result(write.result())
+        else:
+            done.set_exception(error)
+
+    write.add_done_callback(finish)
+    return done
+
+
+def forget_files():
+    """ Stop reusing the files written so far, as a new execution starts. """
+    global _generation
+    with _files_lock:
+        _generation += 1
+        _files.clear()
+
+
+def wait(writes):
+    """ Wait for the futures of writes, logging the writes which failed. """
+    start = time.perf_counter_ns()
+    for future in writes:
+        error = future.exception()
+        if error is not None:
+            logger.error('Failed to write screenshot.\n{0}'.format(error))
+    with _timings_lock:
+        _timings['wait_ns'] += time.perf_counter_ns() - start
+
+
+def timings():
+    """
+    Screenshots captured and written so far, with the nanoseconds spent
+    capturing, writing, and waiting for writes before reporting them.
+    """
+    with _timings_lock:
+        return dict(_timings)
+
+
+def _submit(file_path, content, capture_ns, generation, link):
+    slots = _free_slots()
+    if slots is None:
+        return _write_now(file_path, content, capture_ns, generation, link)
+    if not slots.acquire(blocking=False):
+        start = time.perf_counter_ns()
+        slots.acquire()
+        with _timings_lock:
+            _timings['blocked_writes'] += 1
+            _timings['blocked_ns'] += time.perf_counter_ns() - start
+    try:
+        return _get_writer().submit(_write, file_path, content, capture_ns, generation, link, slots)
+    except BaseException:
+        slots.release()
+        raise
+
+
+def _free_slots():
+    global _slots
+    size = get_screenshot_queue_size()
+    if not size:
+        return None
+    if _slots[0] != size:
+        with _writer_lock:
+            if _slots[0] != size:
+                _slots = (size, threading.BoundedSemaphore(size))
+    return _slots[1]
+
+
+def _get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='screenshots')
+    return _writer
+
+
+def _write_now(file_path, content, capture_ns, generation, link):
+    future = Future()
+    try:
+        future.set_result(_write(file_path, content, capture_ns, generation, link))
+    except Exception as err:
+        future.set_exception(err)
+    return future
+
+
+def _key(generation, file_path, content):
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        digest = hashlib.blake2b(content, digest_size=20)
+    elif hasattr(content, 'tobytes'):
+        shape = getattr(content, 'mode', None), getattr(content, 'size', None)
+        digest = hashlib.blake2b(repr(shape).encode('utf-8'), digest_size=20)
+        digest.update(content.tobytes())
+    else:
+        return None
+    return generation, os.path.dirname(file_path), digest.digest()
+
+
+def _written_file(key, file_path, link):
+    """
+    Path of the file written before with the content of key, or with link,
+    file_path linked to it. None if there is none, or it cannot be linked.
+    """
+    with _files_lock:
+        written = _files.get(key)
+    if written is None or not link:
+        return written
+    try:
+        os.link(written, file_path)
+    except OSError as err:
+        logger.debug('Failed to link screenshot {0} to {1}, writing it.\n{2}',
+                     os.path.basename(file_path), os.path.basename(written), err)
+        return None
+    return file_path
+
+
+def _reduce(content):
+    """ Content scaled down and with its colors reduced as configured, or content itself when these change nothing. """
+    global _pillow_warned
+    max_size, colors = get_screenshot_max_size(), get_screenshot_colors()
+    if not max_size and not colors:
+        return content
+    image = content
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        pillow = _import_pillow('Image')
+        if pillow is None:
+            if not _pillow_warned:
+                _pillow_warned = True
+                logger.warning('Screenshots are not scaled down or reduced in colors, Pillow is not installed.')
+            return content
+        image = pillow.open(io.BytesIO(content))
+    reduced = image
+    if max_size:
+        reduced = _scale(reduced, max_size)
+    if colors:
+        reduced = _quantize(reduced, colors)
+    return content if reduced is image else reduced
+
+
+def _scale(image, max_size):
+    width, height = image.size
+    if max(width, height) <= max_size:
+        return image
+    ratio = max_size / max(width, height)
+    return image.resize((max(1, round(width * ratio)), max(1, round(height * ratio))))
+
+
+def _quantize(image, colors):
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    return image.quantize(colors)
+
+
+def _write(file_path, content, capture_ns, generation=None, link=False, slots=None):
+    start = time.perf_counter_ns()
+    try:
+        # Hashed here rather than on the thread which captured the screenshot.
+        key = _key(generation, file_path, content) if generation is not None else None
+        written = _written_file(key, file_path, link) if key is not None else None
+        if written is not None:
+            with _timings_lock:
+                _timings['reused_files'] += 1
+            return written
+        content = _reduce(content)
+        with open(file_path, 'wb') as f:
+            if isinstance(content, (bytes, bytearray, memoryview)):
+                f.write(content)
+            else:
+                content.save(f, 'PNG')
+        if key is not None:
+            with _files_lock:
+                _files.setdefault(key, file_path)
+    except BaseException:
+        with _timings_lock:
+            _timings['failed_writes'] += 1
+        raise
+    finally:
+        if slots is not None:
+            slots.release()
+    elapsed = time.perf_counter_ns() - start
+    with _timings_lock:
+        _timings['writes'] += 1
+        _timings['write_ns'] += elapsed
+        _timings['max_write_ns'] = max(_timings['max_write_ns'], elapsed)
+    logger.debug('Screenshot {0} captured in {1:.1f} ms, written in {2:.1f} ms.',
+                 os.path.basename(file_path), capture_ns / 1e6, elapsed / 1e6)
+    return file_path
+
+
+def _import_pillow(name):
+    """ The name module of Pillow, or None when Pillow is not installed. """
+    if name not in _pillow:
+        try:
+            _pillow[name] = importlib.import_module('PIL.' + name)
+        except ImportError:
+            _pillow[name] = None
+    return _pillow[name]
+
+
+def _grab_with_pillow():
+    image_grab = _import_pillow('ImageGrab')
+    if image_grab is None:
+        return None
+    try:
+        return image_grab.grab()
+    except Exception as err:
+        logger.debug('Failed to grab the screen with Pillow, using gauge_screenshot.\n{0}'.format(err))
+        return None
+
+
+def _run_gauge_screenshot():
+    fd, temp_file = tempfile.mkstemp(prefix='gauge-screenshot-', suffix='.png')
+    os.close(fd)
+    try:
+        call(['gauge_screenshot', temp_file])
+        with open(temp_file, 'rb') as f:
+            return f.read() or None
+    except Exception as err:
+        logger.error("\nFailed to take screenshot using gauge_screenshot.\n{0}".format(err))
+    except:
+        logger.error("\nFailed to take screenshot using gauge_screenshot.\n{0}".format(sys.exc_info()[0]))
+    finally:
+        os.unlink(temp_file)
+    return None
@@ -1,7 +1,9 @@
 import glob
 
+from getgauge import logger
 from getgauge.parser import Parser
 from getgauge.registry import registry
+from getgauge.util import get_loader_workers
 
 
 def load_steps(python_file: Parser):
@@ -13,13 +15,70 @@ def load_steps(python_file: Parser):
 def reload_steps(file_path, content=None):
     pf = Parser.parse(file_path, content)
     if pf:
-        registry.remove_steps(file_path)
-        load_steps(pf)
+        replace_steps(pf)
 
 
-def load_files(step_impl_dirs):
+def replace_steps(python_file: Parser):
+    """ Replace the steps registered for the file of python_file with its steps. """
+    registry.remove_steps(python_file.file_path)
+    load_steps(python_file)
+
+
+def scan_file(file_path, content=None):
+    """
+    Parse a file, or content read from it, and return its steps as
+    (step_text, func_name, file_path, span) records, which are cheap to send
+    back from a worker process. Returns None if the file could not be parsed.
+    """
+    pf = Parser.parse(file_path, content)
+    if pf is None:
+        return None
+    return [(step, func, file_path, span) for step, func, span in pf.iter_steps()]
+
+
+def _scan_files(file_paths, contents, workers):
+    if workers > 1 and len(file_paths) > 1:
+        # multiprocessing is only imported when scanning in parallel.
+        from concurrent.futures import ProcessPoolExecutor
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(file_paths))) as pool:
+                chunksize = max(1, len(file_paths) // (workers * 4))
+                return list(pool.map(scan_file, file_paths, contents, chunksize=chunksize))
+        except Exception as ex:
+            logger.error("Failed to scan step implementations with {} workers, "
+                         "falling back to a serial scan: {}".format(workers, ex))
+    return [scan_file(file_path, content) for file_path, content in zip(file_paths, contents)]
+
+
+def load_files(step_impl_dirs, step_index=None):
+    """
+    Load steps of all files in step_impl_dirs into the registry. With a
+    StepIndex only files changed since it was built are parsed, and the
+    index is updated with their steps.
+    """
+    file_paths = []
     for step_impl_dir in step_impl_dirs:
-        for file_path in glob.glob(f"{step_impl_dir}/**/*.py", recursive=True):
-            pf = Parser.parse(file_path)
-            if pf:
-                load_steps(pf)
+        file_paths.extend(glob.glob(f"{step_impl_dir}/**/*.py", recursive=True))
+    cached, changed, stats, contents = {}, [], {}, []
+    for file_path in file_paths:
+        steps = step_index.get(file_path) if step_index is not None else None
+        if steps is None:
+            changed.append(file_path)
+            if step_index is not None:
+                # The index hashes the very content which is then parsed.
+                stats[file_path], content = step_index.read(file_path)
+            else:
+                content = None
+            contents.append(content)
+        else:
+            cached[file_path] = [(step, func, file_path, span) for step, func, span in steps]
+    scanned = dict(zip(changed, _scan_files(changed, contents, get_loader_workers())))
+    for file_path in file_paths:
+        records = cached.get(file_path)
+        if records is None:
+            records = scanned[file_path] or []
+            if step_index is not None and scanned[file_path] is not None:
+                step_index.put(file_path, stats[file_path],
+                               [(step, func, span) for step, func, _, span in records])
+        for step_text, func, _, span in records:
+            registry.add_step(step_text, func, file_path, span)
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+
+from getgauge import logger
+from getgauge.util import get_project_root
+
+# Bump whenever the layout of the index or the records produced by the
+# parser change, older indexes are then discarded as a whole.
+STEP_INDEX_VERSION = 1
+STEP_INDEX_FILE = os.path.join('.gauge', 'python', 'step_index.json')
+
+
+class StepIndex(object):
+    """
+    Steps found in each step implementation file, persisted between runner
+    starts. An entry is reused as long as the file has the same mtime and
+    size, or failing that the same content hash.
+    """
+
+    def __init__(self, file_path, step_impl_dirs, entries=None):
+        self.file_path = file_path
+        self.step_impl_dirs = list(step_impl_dirs)
+        self.__entries = entries or {}
+        self.__new_entries = {}
+        self.__read = {}
+
+    @staticmethod
+    def load(step_impl_dirs, file_path=None):
+        """
+        Load the index from file_path (the project's .gauge dir by default).
+        A missing or unreadable index, one written by another version, or one
+        built for other step implementation dirs results in an empty index.
+        """
+        file_path = file_path or os.path.join(get_project_root(), STEP_INDEX_FILE)
+        index = StepIndex(file_path, step_impl_dirs)
+        try:
+            with open(file_path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return index
+        except (OSError, ValueError) as ex:
+            logger.debug("Ignoring step index {}: {}", file_path, ex)
+            return index
+        if not isinstance(data, dict) or data.get('version') != STEP_INDEX_VERSION:
+            return index
+        if data.get('stepImplDirs') != index.step_impl_dirs:
+            return index
+        files = data.get('files')
+        return StepIndex(file_path, step_impl_dirs, files if isinstance(files, dict) else None)
+
+    def get(self, file_path):
+        """
+        Return the cached (step_text, func_name, span) records of file_path if
+        it did not change, otherwise None. Every file looked up is kept for the
+        next save, so the index never holds files which no longer exist. A
+        malformed entry is a miss, like a changed file.
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        entry = self.__entries.get(file_path)
+        steps = _steps_of(entry)
+        if steps is None:
+            return None
+        if entry['mtime'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+            file_stat, content = self.read(file_path)
+            if file_stat is None or entry['hash'] != file_stat['hash']:
+                return None
+            del self.__read[file_path]
+            entry = dict(entry, mtime=file_stat['mtime'], size=file_stat['size'])
+        self.__new_entries[file_path] = entry
+        return steps
+
+    def read(self, file_path):
+        """
+        Snapshot and content of a file to be parsed, the snapshot being taken
+        before the file is read. The bytes read to check an entry in get are
+        hashed and decoded once, and handed out here rather than read again.
+        Returns (None, None) if the file cannot be read.
+        """
+        read = self.__read.pop(file_path, None)
+        if read is not None:
+            return read
+        try:
+            stat = os.stat(file_path)
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None, None
+        file_stat = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'hash': hashlib.sha1(data).hexdigest()}
+        try:
+            # Newlines translated like files read in text mode by the parser.
+            content = data.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        except UnicodeDecodeError:
+            content = None
+        self.__read[file_path] = file_stat, content
+        return file_stat, content
+
+    def put(self, file_path, file_stat, steps):
+        if file_stat is not None:
+            self.__new_entries[file_path] = dict(file_stat, steps=[list(step) for step in steps])
+
+    def save(self):
+        data = {
+            'version': STEP_INDEX_VERSION,
+            'stepImplDirs': self.step_impl_dirs,
+            'files': self.__new_entries,
+        }
+        tmp_path = '{}.{}.tmp'.format(self.file_path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.file_path)
+        except OSError as ex:
+            logger.debug("Failed to save step index {}: {}", self.file_path, ex)
+
+
+def _steps_of(entry):
+    """ The steps of an index entry as (step_text, func_name, span) tuples, None if it is malformed. """
+    if not isinstance(entry, dict) or not isinstance(entry.get('steps'), list):
+        return None
+    if not all(isinstance(entry.get(key), int) for key in ('mtime', 'size')):
+        return None
+    if not isinstance(entry.get('hash'), str):
+        return None
+    steps = []
+    for step in entry['steps']:
+        if not isinstance(step, list) or len(step) != 3:
+            return None
+        if not (isinstance(step[0], str) and isinstance(step[1], str) and isinstance(step[2], dict)):
+            return None
+        steps.append(tuple(step))
+    return steps
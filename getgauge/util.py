@@ -2,6 +2,21 @@ import os
 
 PROJECT_ROOT_ENV = 'GAUGE_PROJECT_ROOT'
 STEP_IMPL_DIR_ENV = 'STEP_IMPL_DIR'
+LOADER_WORKERS_ENV = 'GAUGE_PYTHON_LOADER_WORKERS'
+GRPC_WORKERS_ENV = 'GAUGE_PYTHON_GRPC_WORKERS'
+DEFAULT_GRPC_WORKERS = 4
+GRPC_ASYNC_ENV = 'GAUGE_PYTHON_GRPC_ASYNC'
+MESSAGES_LIMIT_ENV = 'GAUGE_PYTHON_MESSAGES_LIMIT'
+MULTITHREADING_ENV = 'enable_multithreading'
+PARALLEL_STREAMS_ENV = 'GAUGE_PARALLEL_STREAMS_COUNT'
+FORK_SERVER_ENV = 'GAUGE_PYTHON_FORK_SERVER'
+SCREENSHOT_QUEUE_ENV = 'GAUGE_PYTHON_SCREENSHOT_QUEUE'
+SCREENSHOT_MAX_SIZE_ENV = 'GAUGE_PYTHON_SCREENSHOT_MAX_SIZE'
+SCREENSHOT_COLORS_ENV = 'GAUGE_PYTHON_SCREENSHOT_COLORS'
+LOG_LEVEL_ENV = 'GAUGE_PYTHON_LOG_LEVEL'
+PROFILE_ENV = 'GAUGE_PYTHON_PROFILE'
+DEFAULT_MESSAGES_LIMIT = 0
+DEFAULT_SCREENSHOT_QUEUE = 8
 
 
 def get_project_root():
@@ -21,6 +36,103 @@ def get_step_impl_dirs():
     return full_path_dir_names
 
 
+def get_loader_workers():
+    """ Number of processes used to scan step implementation files, 1 scans them serially. """
+    return _get_workers(LOADER_WORKERS_ENV, 1)
+
+
+def get_grpc_workers():
+    """
+    Number of threads serving gRPC requests. With parallel streams, there is
+    one more for each stream, as an execution request holds a thread until
+    its stream is done with it.
+    """
+    workers = _get_workers(GRPC_WORKERS_ENV, DEFAULT_GRPC_WORKERS)
+    return workers + get_parallel_streams() if use_parallel_streams() else workers
+
+
+def get_parallel_streams():
+    """ Number of parallel streams Gauge runs, which defaults to the number of CPUs. """
+    return _get_workers(PARALLEL_STREAMS_ENV, os.cpu_count() or 1)
+
+
+def use_async_grpc_server():
+    """ Whether requests are served by a grpc.aio server. """
+    return os.getenv(GRPC_ASYNC_ENV, '').lower() == 'true'
+
+
+def use_fork_server():
+    """ Whether runners are forked by a server which imports the step implementations once, on Linux. """
+    return os.getenv(FORK_SERVER_ENV, '').lower() == 'true'
+
+
+def use_profiler():
+    """ Whether executions record timings of step and hook implementations and report them when they finish. """
+    return os.getenv(PROFILE_ENV, '').lower() == 'true'
+
+
+def use_parallel_streams():
+    """ Whether Gauge runs parallel streams in this runner, each stream executing on a thread of its own. """
+    return os.getenv(MULTITHREADING_ENV, '').lower() == 'true'
+
+
+def get_messages_limit():
+    """ Bytes of messages kept in memory per step before they spill to a file, 0 for no limit. """
+    try:
+        limit = int(os.getenv(MESSAGES_LIMIT_ENV) or DEFAULT_MESSAGES_LIMIT)
+    except ValueError:
+        return DEFAULT_MESSAGES_LIMIT
+    return max(limit, 0)
+
+
+def get_screenshot_queue_size():
+    """ Screenshots waiting to be written before capturing another one waits, 0 writes them right away. """
+    try:
+        size = int(os.getenv(SCREENSHOT_QUEUE_ENV) or DEFAULT_SCREENSHOT_QUEUE)
+    except ValueError:
+        return DEFAULT_SCREENSHOT_QUEUE
+    return max(size, 0)
+
+
+def get_screenshot_max_size():
+    """ Pixels of the width and height screenshots are scaled down to, 0 keeps their size. """
+    try:
+        size = int(os.getenv(SCREENSHOT_MAX_SIZE_ENV) or 0)
+    except ValueError:
+        return 0
+    return max(size, 0)
+
+
+def get_screenshot_colors():
+    """ Colors screenshots are reduced to, at most 256, 0 keeps their colors. """
+    try:
+        colors = int(os.getenv(SCREENSHOT_COLORS_ENV) or 0)
+    except ValueError:
+        return 0
+    return min(colors, 256) if colors > 1 else 0
+
+
+def get_log_level():
+    """ Lowest level of the messages logged for Gauge, debug logs every message. """
+    return os.getenv(LOG_LEVEL_ENV, '').strip().lower() or 'debug'
+
+
+def _get_workers(env, default):
+    workers = os.getenv(env)
+    if not workers:
+        return default
+    try:
+        workers = int(workers)
+    except ValueError:
+        workers = 0
+    if workers < 1:
+        # Imported here, the logger reads its level from this module.
+        from getgauge import logger
+        logger.warning("{0}={1} is not a number of at least 1, using {2}", env, os.getenv(env), default)
+        return default
+    return workers
+
+
 def get_impl_files():
     step_impl_dirs = get_step_impl_dirs()
     file_list = []
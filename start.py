@@ -6,30 +6,67 @@ from concurrent.futures import ThreadPoolExecutor
 from os import environ, path
 from threading import Timer
 
-import grpc
-import debugpy
-from getgauge import handlers, logger, processor
-from getgauge.impl_loader import copy_skel_files
-from getgauge.messages import services_pb2_grpc as spg
-from getgauge.static_loader import load_files
-from getgauge.util import get_step_impl_dirs
+# grpc and the runner itself are imported when needed, so that runners
+# handing over to the fork server start quickly.
+from getgauge import fork_server, logger
+from getgauge.util import get_grpc_workers, get_step_impl_dirs, use_async_grpc_server, use_fork_server
 
 PLUGIN_JSON = 'python.json'
 VERSION = 'version'
 ATTACH_DEBUGGER_EVENT = 'Runner Ready for Debugging'
+FORK_SERVER = '--fork-server'
 
 
 def main():
     logger.info("Python: {}".format(platform.python_version()))
     if sys.argv[1] == "--init":
+        from getgauge.impl_loader import copy_skel_files
         logger.debug("Initializing gauge project.")
         copy_skel_files()
+    elif sys.argv[1] == FORK_SERVER:
+        fork_server.serve(prewarm, run)
+    elif use_fork_server() and fork_server.is_supported():
+        # Everything heavy is imported by the fork server, once for all runners.
+        try:
+            status = fork_server.run_runner([sys.executable, path.abspath(__file__), FORK_SERVER])
+        except OSError as err:
+            logger.warning('Failed to fork the runner from the fork server, starting it as usual.\n{0}', err)
+            run()
+        else:
+            sys.exit(status)
     else:
-        load_implementations()
-        start()
+        run()
+
+
+def run():
+    # Steps are loaded statically only once a language server request needs
+    # them, executions import them instead.
+    start(load_steps=load_implementations)
+
+
+def prewarm():
+    """
+    Import the runner and the step implementations, along with everything
+    they import, ahead of forking runners. The step implementation modules
+    themselves are forgotten again, so that each runner imports them afresh.
+    """
+    import grpc  # noqa: F401
+    from getgauge import handlers  # noqa: F401
+    from getgauge.impl_loader import forget_impls, load_impls
+    from getgauge.registry import registry
+    step_impl_dirs = [path.join(path.abspath(d), '') for d in get_step_impl_dirs()]
+    load_impls(get_step_impl_dirs())
+    forget_impls()
+    for name, module in list(sys.modules.items()):
+        file_name = getattr(module, '__file__', None)
+        if file_name and any(path.abspath(file_name).startswith(d) for d in step_impl_dirs):
+            del sys.modules[name]
+    registry.clear()
 
 
 def load_implementations():
+    from getgauge.static_loader import load_files
+    from getgauge.step_index import StepIndex
     d = get_step_impl_dirs()
     logger.debug(
         "Loading step implementations from {} dirs.".format(', '.join(d)))
@@ -37,34 +74,67 @@ def load_implementations():
         if not path.exists(impl_dir):
             logger.error('can not load implementations from {}. {} does not exist.'.format(
                 impl_dir, impl_dir))
-    load_files(d)
+    step_index = StepIndex.load(d)
+    load_files(d, step_index)
+    step_index.save()
 
 
 def _handle_detached():
     logger.info("No debugger attached. Stopping the execution.")
+    logger.flush()
     os._exit(1)
 
 
-def start():
+def start(load_steps=None):
+    import grpc
+    from getgauge import handlers
+    from getgauge.messages import services_pb2_grpc as spg
     if environ.get('DEBUGGING'):
+        import debugpy
         debugpy.listen(('127.0.0.1', int(environ.get('DEBUG_PORT'))))
+        # Gauge waits for the event, after the log lines buffered so far.
+        logger.flush()
         print(ATTACH_DEBUGGER_EVENT)
         t = Timer(int(environ.get("debugger_wait_time", 30)), _handle_detached)
         t.start()
         debugpy.wait_for_client()
         t.cancel()
+    if use_async_grpc_server():
+        import asyncio
+        asyncio.run(_serve_async(load_steps))
+        logger.flush()
+        os._exit(0)
     logger.debug('Starting grpc server..')
-    server = grpc.server(ThreadPoolExecutor(max_workers=1))
+    server = grpc.server(ThreadPoolExecutor(max_workers=get_grpc_workers()))
     p = server.add_insecure_port('127.0.0.1:0')
-    handler = handlers.GrpcServiceHandler(server)
+    handler = handlers.GrpcServiceHandler(server, load_steps)
     spg.add_RunnerServicer_to_server(handler, server)
+    handlers.add_runner_extensions_to_server(handler, server)
     logger.info('Listening on port:{}'.format(p))
+    logger.flush()
     server.start()
     t = threading.Thread(name="listener", target=handler.wait_for_kill_event)
     t.start()
     t.join()
+    logger.flush()
     os._exit(0)
 
 
+async def _serve_async(load_steps=None):
+    import grpc
+    from getgauge import handlers
+    from getgauge.messages import services_pb2_grpc as spg
+    logger.debug('Starting grpc.aio server..')
+    server = grpc.aio.server()
+    p = server.add_insecure_port('127.0.0.1:0')
+    handler = handlers.AsyncGrpcServiceHandler(server, load_steps)
+    spg.add_RunnerServicer_to_server(handler, server)
+    handlers.add_runner_extensions_to_server(handler, server)
+    logger.info('Listening on port:{}'.format(p))
+    logger.flush()
+    await server.start()
+    await handler.wait_for_kill_event()
+
+
 if __name__ == '__main__':
     main()
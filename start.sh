@@ -6,4 +6,5 @@ if [ -z "$GAUGE_PYTHON_COMMAND" ]; then
 fi
 ${GAUGE_PYTHON_COMMAND} check_and_install_getgauge.py
 
-${GAUGE_PYTHON_COMMAND} -u start.py $1
\ No newline at end of file
+# Replaced by the runner, so that Gauge is its parent process.
+exec ${GAUGE_PYTHON_COMMAND} -u start.py $1
\ No newline at end of file
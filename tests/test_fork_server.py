@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from textwrap import dedent
+from unittest.mock import patch
+
+from getgauge import fork_server
+
+SERVER = dedent('''
+    import os, sys
+    from getgauge import fork_server
+    prewarmed = []
+
+    def run_child():
+        print(len(prewarmed), os.getppid(), os.getenv('MESSAGE'), flush=True)
+        sys.exit(int(os.getenv('EXIT_STATUS', '0')))
+
+    fork_server.serve(lambda: prewarmed.append(os.getpid()), run_child, idle_timeout=2)
+''')
+RUNNER = dedent('''
+    import sys
+    from getgauge import fork_server
+    sys.exit(fork_server.run_runner([sys.executable, '-c', {!r}]))
+''').format(SERVER)
+# Runs the runner in place of Gauge, and exits along with it.
+GAUGE = dedent('''
+    import subprocess, sys
+    sys.exit(subprocess.run([sys.executable, '-c', {!r}]).returncode)
+''').format(RUNNER)
+
+
+@unittest.skipUnless(fork_server.is_supported(), 'fork server is supported on Linux only')
+class ForkServerTests(unittest.TestCase):
+    def setUp(self):
+        self.project_root = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, self.project_root)
+
+    def run_runner(self, script=RUNNER, **env):
+        env = dict(os.environ, GAUGE_PROJECT_ROOT=self.project_root, **env)
+        env['PYTHONPATH'] = os.pathsep.join([os.getcwd(), env.get('PYTHONPATH', '')])
+        return subprocess.run([sys.executable, '-c', script], env=env, stdout=subprocess.PIPE,
+                              universal_newlines=True, timeout=30)
+
+    def test_runners_are_forked_from_one_prewarmed_server(self):
+        first = self.run_runner(MESSAGE='first')
+        second = self.run_runner(MESSAGE='second', EXIT_STATUS='3')
+
+        self.assertEqual(0, first.returncode)
+        self.assertEqual(3, second.returncode)
+        prewarmed, server, message = first.stdout.split()
+        self.assertEqual(['1', server, 'second'], second.stdout.split())
+        self.assertEqual(['1', 'first'], [prewarmed, message])
+
+    def test_servers_exit_with_the_gauge_process_which_started_them(self):
+        first = self.run_runner(GAUGE, MESSAGE='first')
+        second = self.run_runner(GAUGE, MESSAGE='second')
+
+        first_server, second_server = first.stdout.split()[1], second.stdout.split()[1]
+        self.assertNotEqual(first_server, second_server)
+        deadline = time.monotonic() + 5
+        while os.path.exists('/proc/{}'.format(second_server)) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertFalse(os.path.exists('/proc/{}'.format(second_server)))
+
+    def test_sockets_are_in_a_directory_private_to_the_user(self):
+        runtime_dir = tempfile.mkdtemp()
+        self.addCleanup(os.rmdir, runtime_dir)
+        with patch.dict(os.environ, {'XDG_RUNTIME_DIR': runtime_dir}):
+            path = fork_server.socket_path('owner')
+            self.assertEqual(os.path.join(runtime_dir, 'gauge-python'), os.path.dirname(path))
+            self.assertEqual(0o700, os.stat(os.path.dirname(path)).st_mode & 0o777)
+
+            os.chmod(os.path.dirname(path), 0o755)
+            self.addCleanup(os.rmdir, os.path.dirname(path))
+            with self.assertRaises(PermissionError):
+                fork_server.socket_path('owner')
+
+
+if __name__ == '__main__':
+    unittest.main()
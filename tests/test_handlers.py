@@ -0,0 +1,294 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from getgauge import processor
+from getgauge.handlers import AsyncGrpcServiceHandler, GrpcServiceHandler
+from getgauge.messages.messages_pb2 import (CacheFileRequest, ExecuteStepRequest, ExecutionStartingRequest, Message,
+                                            RefactorRequest, RefactorResponse, ScenarioDataStoreInitRequest,
+                                            StepNamesRequest)
+from getgauge.python import Messages, data_store, with_current_context
+from getgauge.registry import registry
+
+
+class GrpcServiceHandlerTests(unittest.TestCase):
+    def setUp(self):
+        registry.clear()
+        self.handler = GrpcServiceHandler(None)
+
+    def tearDown(self):
+        registry.clear()
+
+    def test_execution_requests_run_one_at_a_time_on_the_same_thread(self):
+        threads, running = set(), []
+
+        def step_impl():
+            running.append(1)
+            self.assertEqual(1, len(running))
+            threads.add(threading.current_thread())
+            running.pop()
+
+        registry.add_step('Step 1', step_impl, '')
+        request = ExecuteStepRequest(parsedStepText='Step 1')
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            responses = list(pool.map(lambda _: self.handler.ExecuteStep(request, None), range(20)))
+
+        self.assertFalse(any(r.executionResult.failed for r in responses))
+        self.assertEqual(1, len(threads))
+        self.assertNotEqual(threading.current_thread(), threads.pop())
+
+    def test_read_requests_are_served_while_a_step_is_running(self):
+        step_started, names_served = threading.Event(), threading.Event()
+
+        def step_impl():
+            step_started.set()
+            self.assertTrue(names_served.wait(5))
+
+        registry.add_step('Step 1', step_impl, '')
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            response = pool.submit(self.handler.ExecuteStep, ExecuteStepRequest(parsedStepText='Step 1'), None)
+            self.assertTrue(step_started.wait(5))
+            self.assertEqual(['Step 1'], list(self.handler.GetStepNames(StepNamesRequest(), None).steps))
+            names_served.set()
+
+            self.assertFalse(response.result(5).executionResult.failed)
+
+    def test_cache_file_requests_are_served_while_a_step_is_running(self):
+        step_started, file_cached = threading.Event(), threading.Event()
+
+        def step_impl():
+            step_started.set()
+            self.assertTrue(file_cached.wait(5))
+
+        registry.add_step('Step 1', step_impl, '')
+        request = CacheFileRequest(filePath='foo.py', content='@step("Step 2")\ndef step2():\n    pass\n',
+                                   status=CacheFileRequest.OPENED)
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            response = pool.submit(self.handler.ExecuteStep, ExecuteStepRequest(parsedStepText='Step 1'), None)
+            self.assertTrue(step_started.wait(5))
+            self.handler.CacheFile(request, None)
+            self.assertEqual({'Step 1', 'Step 2'}, set(self.handler.GetStepNames(StepNamesRequest(), None).steps))
+            file_cached.set()
+
+            self.assertFalse(response.result(5).executionResult.failed)
+
+    def test_read_requests_are_served_while_a_file_is_parsed(self):
+        parsing, names_served = threading.Event(), threading.Event()
+        parse = processor.parse_cache_file_request
+
+        def slow_parse(request):
+            parsing.set()
+            self.assertTrue(names_served.wait(5))
+            return parse(request)
+
+        registry.add_step('Step 1', None, '')
+        request = CacheFileRequest(filePath='foo.py', content='@step("Step 2")\ndef step2():\n    pass\n',
+                                   status=CacheFileRequest.OPENED)
+        with patch('getgauge.processor.parse_cache_file_request', slow_parse), \
+                ThreadPoolExecutor(max_workers=1) as pool:
+            cached = pool.submit(self.handler.CacheFile, request, None)
+            self.assertTrue(parsing.wait(5))
+            self.assertEqual(['Step 1'], list(self.handler.GetStepNames(StepNamesRequest(), None).steps))
+            names_served.set()
+            cached.result(5)
+
+        self.assertEqual({'Step 1', 'Step 2'}, set(self.handler.GetStepNames(StepNamesRequest(), None).steps))
+
+    def test_refactor_requests_run_one_at_a_time(self):
+        running = []
+
+        def refactor(request):
+            running.append(1)
+            self.assertEqual(1, len(running))
+            threading.Event().wait(0.01)
+            running.pop()
+            return RefactorResponse(success=True)
+
+        with patch('getgauge.processor.process_refactor_request', refactor), ThreadPoolExecutor(max_workers=4) as pool:
+            responses = list(pool.map(lambda _: self.handler.Refactor(RefactorRequest(), None), range(8)))
+
+        self.assertTrue(all(r.success for r in responses))
+
+    def test_execute_steps_runs_the_batch_on_the_execution_thread(self):
+        threads = []
+        registry.add_step('Step 1', lambda: threads.append(threading.current_thread()), '')
+        requests = [Message(messageType=Message.ExecuteStep,
+                            executeStepRequest=ExecuteStepRequest(parsedStepText='Step 1'))] * 3
+
+        responses = list(self.handler.ExecuteSteps(iter(requests), None))
+
+        self.assertEqual(3, len(responses))
+        self.assertFalse(any(r.executionResult.failed for r in responses))
+        self.assertEqual(1, len(set(threads)))
+        self.assertNotEqual(threading.current_thread(), threads[0])
+
+    def test_execute_step_stream_sends_messages_while_the_step_runs(self):
+        message_received = threading.Event()
+
+        def step_impl():
+            Messages.write_message('started')
+            self.assertTrue(message_received.wait(5))
+
+        registry.add_step('Step 1', step_impl, '')
+        responses = self.handler.ExecuteStepStream(ExecuteStepRequest(parsedStepText='Step 1'), None)
+
+        self.assertEqual(['started'], list(next(responses).executionResult.message))
+        message_received.set()
+        result = next(responses)
+        self.assertFalse(result.executionResult.failed)
+        self.assertEqual([], list(result.executionResult.message))
+        self.assertEqual([], list(responses))
+
+
+class StaticLoadingTests(unittest.TestCase):
+    def setUp(self):
+        registry.clear()
+        self.loads = []
+        self.handler = GrpcServiceHandler(None, lambda: self.loads.append(registry.add_step('Step 1', None, '')))
+
+    def tearDown(self):
+        registry.clear()
+
+    def test_steps_are_loaded_before_the_first_language_server_request(self):
+        self.assertEqual([], self.loads)
+
+        self.assertEqual(['Step 1'], list(self.handler.GetStepNames(StepNamesRequest(), None).steps))
+        self.assertEqual(['Step 1'], list(self.handler.GetStepNames(StepNamesRequest(), None).steps))
+        self.assertEqual(1, len(self.loads))
+
+    def test_steps_are_not_loaded_for_executions(self):
+        with patch('getgauge.processor.reload_impls'):
+            self.handler.StartExecution(ExecutionStartingRequest(), None)
+        self.handler.GetStepNames(StepNamesRequest(), None)
+
+        self.assertEqual([], self.loads)
+
+
+class ParallelStreamsTests(unittest.TestCase):
+    def setUp(self):
+        registry.clear()
+        self.handler = GrpcServiceHandler(None)
+        self.handler.parallel_streams = True
+
+    def tearDown(self):
+        registry.clear()
+
+    def test_streams_execute_in_parallel_with_data_stores_and_messages_of_their_own(self):
+        both_running = threading.Barrier(2)
+
+        def step_impl(name):
+            both_running.wait(5)
+            data_store.scenario.name = name
+            Messages.write_message(name)
+            both_running.wait(5)
+            self.assertEqual(name, data_store.scenario.name)
+
+        registry.add_step('Step <name>', step_impl, '')
+
+        def execute(stream):
+            self.handler.InitializeScenarioDataStore(ScenarioDataStoreInitRequest(stream=stream), None)
+            request = ExecuteStepRequest(parsedStepText='Step {}', stream=stream)
+            request.parameters.add(value='stream {}'.format(stream))
+            return self.handler.ExecuteStep(request, None)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            responses = list(pool.map(execute, [1, 2]))
+
+        self.assertEqual([False, False], [r.executionResult.failed for r in responses])
+        self.assertEqual([['stream 1'], ['stream 2']], [list(r.executionResult.message) for r in responses])
+        self.assertNotIn('name', data_store.scenario)
+
+    def test_streams_do_not_report_messages_of_threads_started_in_other_streams(self):
+        written = threading.Event()
+
+        def step_impl(name):
+            if name == 'stream 1':
+                for target, message in ((with_current_context(Messages.write_message), 'stream 1 thread'),
+                                        (Messages.write_message, 'unbound thread')):
+                    thread = threading.Thread(target=target, args=(message,))
+                    thread.start()
+                    thread.join(5)
+                written.set()
+            else:
+                written.wait(5)
+            Messages.write_message(name)
+
+        registry.add_step('Step <name>', step_impl, '')
+
+        def execute(stream):
+            request = ExecuteStepRequest(parsedStepText='Step {}', stream=stream)
+            request.parameters.add(value='stream {}'.format(stream))
+            return self.handler.ExecuteStep(request, None)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            responses = list(pool.map(execute, [1, 2]))
+
+        self.assertEqual([['stream 1 thread', 'stream 1'], ['stream 2']],
+                         [list(r.executionResult.message) for r in responses])
+        request = ExecuteStepRequest(parsedStepText='Step {}')
+        request.parameters.add(value='unbound')
+        response = self.handler.ExecuteStep(request, None)
+        self.assertEqual(['unbound thread', 'unbound'], list(response.executionResult.message))
+
+
+class AsyncGrpcServiceHandlerTests(unittest.TestCase):
+    def setUp(self):
+        registry.clear()
+        self.handler = AsyncGrpcServiceHandler(None)
+
+    def tearDown(self):
+        registry.clear()
+
+    def test_requests_are_coroutines(self):
+        threads = []
+
+        async def step_impl():
+            threads.append(threading.current_thread())
+
+        registry.add_step('Step 1', step_impl, '')
+
+        async def requests():
+            names = await self.handler.GetStepNames(StepNamesRequest(), None)
+            responses = await asyncio.gather(*[
+                self.handler.ExecuteStep(ExecuteStepRequest(parsedStepText='Step 1'), None) for _ in range(3)])
+            return names, responses
+
+        names, responses = asyncio.run(requests())
+
+        self.assertEqual(['Step 1'], list(names.steps))
+        self.assertFalse(any(r.executionResult.failed for r in responses))
+        self.assertEqual(3, len(threads))
+        self.assertEqual(1, len(set(threads)))
+
+    def test_execute_steps_streams_the_batch_responses(self):
+        registry.add_step('Step 1', lambda: None, '')
+
+        async def requests():
+            for _ in range(2):
+                yield Message(messageType=Message.ExecuteStep,
+                              executeStepRequest=ExecuteStepRequest(parsedStepText='Step 1'))
+
+        async def execute():
+            return [response async for response in self.handler.ExecuteSteps(requests(), None)]
+
+        responses = asyncio.run(execute())
+
+        self.assertEqual(2, len(responses))
+        self.assertFalse(any(r.executionResult.failed for r in responses))
+
+    def test_execute_step_stream_sends_messages_ahead_of_the_result(self):
+        registry.add_step('Step 1', lambda: Messages.write_message('output'), '')
+
+        async def execute():
+            return [response async for response in
+                    self.handler.ExecuteStepStream(ExecuteStepRequest(parsedStepText='Step 1'), None)]
+
+        responses = asyncio.run(execute())
+
+        self.assertEqual([['output'], []], [list(r.executionResult.message) for r in responses])
+
+
+if __name__ == '__main__':
+    unittest.main()
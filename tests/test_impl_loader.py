@@ -1,7 +1,14 @@
 import os
+import shutil
+import sys
+import tempfile
 import unittest
+from unittest.mock import patch
 
-from getgauge.impl_loader import update_step_registry_with_class
+from getgauge.impl_loader import (_has_methods_with_gauge_decoratores, forget_impls, reload_impls,
+                                  update_step_registry_with_class)
+from getgauge.python import after_scenario, continue_on_failure, step
+from getgauge.registry import registry
 from test_relative_import.relative_import_class import Sample
 
 
@@ -26,6 +33,105 @@ class ImplLoaderTest(unittest.TestCase):
                           "Greet <name> from outside the class"], 
                           [method.step_text for method in method_list])
 
+    def test_has_methods_with_gauge_decorators(self):
+        self.addCleanup(registry.remove_file, __file__)
+
+        class Steps:
+            @continue_on_failure
+            @step('Step in a class')
+            def impl(self):
+                pass
+
+        class Hooks:
+            @after_scenario('<tag>')
+            def hook(self):
+                pass
+
+        class Helpers:
+            @continue_on_failure
+            def helper(self):
+                pass
+
+            @staticmethod
+            def static_helper():
+                pass
+
+        class Derived(Steps):
+            pass
+
+        self.assertTrue(_has_methods_with_gauge_decoratores(Steps))
+        self.assertTrue(_has_methods_with_gauge_decoratores(Hooks))
+        self.assertFalse(_has_methods_with_gauge_decoratores(Helpers))
+        self.assertFalse(_has_methods_with_gauge_decoratores(Derived))
+
+
+class ReloadImplsTest(unittest.TestCase):
+    def setUp(self):
+        self.project_root = tempfile.mkdtemp()
+        self.step_impl_dir = os.path.join(self.project_root, 'reloaded_step_impl')
+        os.mkdir(self.step_impl_dir)
+        self.addCleanup(shutil.rmtree, self.project_root)
+        self.addCleanup(os.chdir, os.getcwd())
+        patcher = patch('getgauge.impl_loader.project_root', self.project_root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sys.path.insert(0, self.project_root)
+        self.addCleanup(sys.path.remove, self.project_root)
+        registry.clear()
+        self.addCleanup(registry.clear)
+        self.addCleanup(forget_impls)
+
+    def write_step(self, file_name, step_text):
+        file_path = os.path.join(self.step_impl_dir, file_name)
+        with open(file_path, 'w') as f:
+            f.write('from getgauge.python import step\n\n\n@step("{}")\ndef impl():\n    pass\n'.format(step_text))
+        return file_path
+
+    def test_reload_impls_imports_only_changed_files(self):
+        first = self.write_step('first.py', 'First')
+        second = self.write_step('second.py', 'Second')
+        reload_impls([self.step_impl_dir])
+        first_info = registry.get_info_for('First')
+
+        self.assertEqual(['First', 'Second'], sorted(registry.steps()))
+
+        self.write_step('second.py', 'Second changed')
+        self.write_step('third.py', 'Third')
+        reload_impls([self.step_impl_dir])
+
+        self.assertIs(first_info, registry.get_info_for('First'))
+        self.assertEqual(['First', 'Second changed', 'Third'], sorted(registry.steps()))
+
+        os.remove(second)
+        registry.remove_file(first)
+        reload_impls([self.step_impl_dir])
+
+        self.assertIsNot(first_info, registry.get_info_for('First'))
+        self.assertEqual(['First', 'Third'], sorted(registry.steps()))
+
+    def test_reload_impls_forgets_continue_on_failure_of_reimported_and_removed_files(self):
+        file_path = os.path.join(self.step_impl_dir, 'recoverable.py')
+
+        def write(step_text):
+            with open(file_path, 'w') as f:
+                f.write('from getgauge.python import continue_on_failure, step\n\n\n'
+                        '@continue_on_failure\n@step("{}")\ndef impl():\n    pass\n'.format(step_text))
+
+        write('Recoverable')
+        reload_impls([self.step_impl_dir])
+        first = registry.get_info_for('Recoverable').impl
+        self.assertTrue(registry.is_continue_on_failure(first, AssertionError()))
+
+        write('Recoverable changed')
+        reload_impls([self.step_impl_dir])
+        second = registry.get_info_for('Recoverable changed').impl
+        self.assertFalse(registry.is_continue_on_failure(first, AssertionError()))
+        self.assertTrue(registry.is_continue_on_failure(second, AssertionError()))
+
+        os.remove(file_path)
+        reload_impls([self.step_impl_dir])
+        self.assertFalse(registry.is_continue_on_failure(second, AssertionError()))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import Mock, patch
+
+from getgauge.handlers import GrpcServiceHandler
+from getgauge.messages.messages_pb2 import ExecutionStartingRequest, StepValidateRequest
+from getgauge.registry import registry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Imported by the language server features and debugging only, execution
+# runs of every parallel stream must not pay for them.
+LAZY_MODULES = ['debugpy', 'redbaron', 'baron', 'multiprocessing', 'getgauge.redbaron_parser',
+                'getgauge.refactor', 'getgauge.validator', 'getgauge.static_loader', 'getgauge.parser']
+
+
+def imported_modules(code):
+    """ Modules imported by running code in a fresh interpreter, with their cumulative import time in us. """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            env=dict(os.environ, PYTHONPATH=ROOT), stdout=subprocess.PIPE,
+                            stderr=subprocess.PIPE, universal_newlines=True, timeout=60)
+    if result.returncode != 0:
+        raise AssertionError(result.stderr)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:'):
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                modules[name.strip()] = int(cumulative)
+    return modules
+
+
+class ImportTimeTests(unittest.TestCase):
+    def test_runner_handing_over_to_the_fork_server_does_not_import_grpc(self):
+        modules = imported_modules('import start')
+
+        self.assertNotIn('grpc', modules)
+        self.assertEqual([], [m for m in LAZY_MODULES if m in modules])
+
+    def test_execution_does_not_import_language_server_modules(self):
+        modules = imported_modules(
+            'import start\n'
+            'from getgauge import handlers, processor\n'
+            'from getgauge.messages.messages_pb2 import ExecuteStepRequest\n'
+            'processor.process_execute_step_request(ExecuteStepRequest())')
+
+        self.assertIn('getgauge.handlers', modules)
+        self.assertEqual([], [m for m in LAZY_MODULES if m in modules])
+
+    def test_language_server_modules_are_imported_on_first_use(self):
+        modules = imported_modules(
+            'from getgauge import processor\n'
+            'from getgauge.messages.messages_pb2 import StepValidateRequest\n'
+            'processor.process_validate_step_request(StepValidateRequest())')
+
+        self.assertIn('getgauge.validator', modules)
+
+
+
+class DeferredStaticLoadTests(unittest.TestCase):
+    def setUp(self):
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_validation_ahead_of_an_execution_does_not_load_steps_statically(self):
+        load_steps = Mock()
+        handler = GrpcServiceHandler(None, load_steps)
+
+        def import_impls(step_impl_dirs):
+            if not registry.is_implemented('Step {}'):
+                registry.add_step('Step <name>', lambda name: None, '')
+
+        with patch('getgauge.processor.reload_impls', side_effect=import_impls):
+            validation = handler.ValidateStep(StepValidateRequest(stepText='Step {}'), None)
+            execution = handler.StartExecution(ExecutionStartingRequest(), None)
+
+        self.assertTrue(validation.isValid)
+        self.assertFalse(execution.executionResult.failed)
+        load_steps.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import io
+import json
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from getgauge import logger
+
+
+class LoggerTests(TestCase):
+    def setUp(self):
+        logger.flush()
+
+    def test_lines_keep_the_wire_format(self):
+        stdout = io.StringIO()
+        with patch('sys.stdout', stdout):
+            logger.info('Listening on port:{}', 1234)
+            logger.debug('quotes " and unicode é')
+            logger.flush()
+
+        self.assertEqual(json.dumps({"logLevel": "info", "message": "Listening on port:1234"}) + '\n' +
+                         json.dumps({"logLevel": "debug", "message": 'quotes " and unicode é'}) + '\n',
+                         stdout.getvalue())
+
+    def test_errors_are_written_after_the_buffered_lines(self):
+        output = io.StringIO()
+        with patch('sys.stdout', output), patch('sys.stderr', output):
+            logger.info('first')
+            logger.error('second')
+
+        self.assertEqual(['first', 'second'], [json.loads(line)['message'] for line in output.getvalue().splitlines()])
+
+    def test_messages_below_the_threshold_are_not_formatted(self):
+        class Message:
+            def format(self, *args):
+                raise AssertionError('formatted')
+
+        stdout = io.StringIO()
+        with patch('getgauge.logger._threshold', logger.LEVELS['info']), patch('sys.stdout', stdout):
+            logger.debug(Message(), 'arg')
+            logger.flush()
+            self.assertFalse(logger.is_enabled('debug'))
+
+        self.assertEqual('', stdout.getvalue())
+
+    def test_unbuffered_lines_are_written_right_away_without_a_thread(self):
+        stdout = io.StringIO()
+        writer = logger._writer
+        self.addCleanup(setattr, logger, '_writer', writer)
+        with patch('sys.stdout', stdout):
+            logger.info('buffered')
+            logger.unbuffer()
+            self.assertFalse(writer._thread.is_alive())
+            self.assertEqual(['buffered'], [json.loads(line)['message'] for line in stdout.getvalue().splitlines()])
+
+            logger.info('unbuffered')
+            self.assertEqual('unbuffered', json.loads(stdout.getvalue().splitlines()[-1])['message'])
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@ import sys
 import unittest
 from textwrap import dedent
 from getgauge.parser import Parser
+from getgauge.redbaron_parser import RedBaronParser
 
 
 def _span(start, startChar, end, endChar):
@@ -651,5 +652,86 @@ class ParserTests(unittest.TestCase):
         """).format(expectedArgs))
 
 
+class RedBaronParserTests(ParserTests):
+    def parse(self, content, file_path='foo.py'):
+        return RedBaronParser.parse(file_path, content)
+
+
+class ParserSpanTests(unittest.TestCase):
+    def assertSameSpans(self, content):
+        steps = list(Parser.parse('foo.py', content).iter_steps())
+        expected = list(RedBaronParser.parse('foo.py', content).iter_steps())
+        self.assertEqual(len(steps), len(expected))
+        for actual, redbaron in zip(steps, expected):
+            self.assertEqual(actual[:2], redbaron[:2])
+            self.assertEqual(actual[2], redbaron[2]())
+
+    def test_spans_match_redbaron_for_top_level_functions(self):
+        self.assertSameSpans(dedent('''\
+        @step("print hello")
+        def print_hello():
+            print("hello")
+
+        # section comment
+        @step("print <word>")
+        def print_word(word):  # tail
+            print(word)
+        x = 1
+        '''))
+
+    def test_spans_match_redbaron_for_methods_and_nested_functions(self):
+        self.assertSameSpans(dedent('''\
+        class Steps:
+            @step("print hello")
+            def print_hello(self):
+                print("hello")
+
+
+            @step(["print <word>", "say <word>"])
+            def print_word(self, word):
+                def inner():
+                    pass
+                @step("nested")
+                def nested(): pass
+
+            # trailing comment
+        y = 2
+        '''))
+
+    def test_spans_match_redbaron_without_trailing_newline(self):
+        self.assertSameSpans('@step("a")\ndef f():\n    pass')
+
+    def test_iter_steps_loads_async_functions(self):
+        content = dedent('''\
+        @step("print hello")
+        async def print_hello():
+            print("hello")
+        ''')
+        steps = list(Parser.parse('foo.py', content).iter_steps())
+        self.assertEqual(len(steps), 1)
+        self.assertEqual(steps[0][0], "print hello")
+        self.assertEqual(steps[0][1], "print_hello")
+        self.assertEqual(steps[0][2], _span(1, 0, 4, 0))
+
+    def test_iter_steps_loads_steps_from_syntax_unknown_to_redbaron(self):
+        content = dedent('''\
+        @step("print <n>")
+        def print_n(n):
+            if (m := int(n)) > 0:
+                print(m)
+        ''')
+        steps = list(Parser.parse('foo.py', content).iter_steps())
+        self.assertEqual(len(steps), 1)
+        self.assertEqual(steps[0][0], "print <n>")
+
+    def test_iter_steps_ignores_step_decorator_without_arguments(self):
+        content = dedent('''\
+        @step
+        def print_hello():
+            print("hello")
+        ''')
+        self.assertEqual(list(Parser.parse('foo.py', content).iter_steps()), [])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,7 +1,10 @@
+import asyncio
 import os
+import threading
 from os import path
 from textwrap import dedent
 from unittest import main
+from unittest.mock import patch
 
 from getgauge import processor
 from getgauge import static_loader as loader
@@ -9,9 +12,11 @@ from getgauge.exceptions import SkipScenarioException
 from getgauge.messages.messages_pb2 import *
 from getgauge.messages.spec_pb2 import Parameter, ProtoExecutionResult, Span
 from getgauge.parser import Parser
+# Build baron's grammar before the filesystem is faked, refactoring imports it lazily
+import getgauge.redbaron_parser  # noqa: F401
 from getgauge.messages.spec_pb2 import ProtoStepValue
 from getgauge.util import get_step_impl_dirs
-from getgauge.python import data_store
+from getgauge.python import Messages, Screenshots, data_store
 from getgauge.registry import registry
 from pyfakefs.fake_filesystem_unittest import TestCase
 
@@ -336,6 +341,176 @@ class ProcessorTests(TestCase):
         self.assertIsInstance(response, ExecutionStatusResponse)
         self.assertFalse(response.executionResult.failed)
 
+    def test_Processor_step_hooks_are_resolved_for_the_running_scenario(self):
+        calls = []
+        registry.add_before_step(lambda: calls.append('before tagged'), '<a>')
+        registry.add_before_step(lambda: calls.append('before other'), '<b>')
+        registry.add_after_step(lambda: calls.append('after'))
+        request = ScenarioExecutionStartingRequest()
+        request.currentExecutionInfo.currentScenario.tags.append('a')
+        processor.process_scenario_execution_starting_request(request)
+
+        processor.process_step_execution_starting_request(StepExecutionStartingRequest())
+        processor.process_step_execution_ending_request(StepExecutionEndingRequest())
+
+        self.assertEqual(['before tagged', 'after'], calls)
+
+        registry.add_before_step(lambda: calls.append('before added'))
+        processor.process_step_execution_starting_request(StepExecutionStartingRequest())
+
+        self.assertEqual(['before tagged', 'after', 'before tagged', 'before added'], calls)
+
+        processor.process_scenario_execution_ending_request(ScenarioExecutionEndingRequest())
+        del calls[:]
+        request = StepExecutionStartingRequest()
+        request.currentExecutionInfo.currentSpec.tags.append('b')
+        processor.process_step_execution_starting_request(request)
+
+        self.assertEqual(['before other', 'before added'], calls)
+
+    def test_Processor_execute_async_step_request(self):
+        loops = []
+
+        async def async_impl():
+            await asyncio.sleep(0)
+            loops.append(asyncio.get_running_loop())
+
+        async def failing_async_impl():
+            await asyncio.sleep(0)
+            raise AssertionError('async failure')
+
+        registry.add_step('Step 1', async_impl, '')
+        registry.add_step('Step 2', failing_async_impl, '')
+
+        for _ in range(2):
+            response = processor.process_execute_step_request(ExecuteStepRequest(parsedStepText='Step 1'))
+            self.assertFalse(response.executionResult.failed)
+        response = processor.process_execute_step_request(ExecuteStepRequest(parsedStepText='Step 2'))
+
+        self.assertEqual(2, len(loops))
+        self.assertIs(loops[0], loops[1])
+        self.assertTrue(response.executionResult.failed)
+        self.assertEqual('async failure', response.executionResult.errorMessage)
+
+    def test_Processor_execute_steps_request(self):
+        calls = []
+        registry.add_before_step(lambda: calls.append('before'))
+        registry.add_after_step(lambda: calls.append('after'))
+        registry.add_step('Step 1', lambda: calls.append('Step 1'), '')
+        registry.add_step('Step 2', failing_impl, '')
+        registry.continue_on_failure(failing_impl, [IndexError])
+
+        def step_messages(step_text):
+            return [Message(messageType=Message.StepExecutionStarting,
+                            stepExecutionStartingRequest=StepExecutionStartingRequest()),
+                    Message(messageType=Message.ExecuteStep,
+                            executeStepRequest=ExecuteStepRequest(parsedStepText=step_text)),
+                    Message(messageType=Message.StepExecutionEnding,
+                            stepExecutionEndingRequest=StepExecutionEndingRequest())]
+
+        responses = processor.process_execute_steps_request(
+            step_messages('Step 1') + step_messages('Step 2') + step_messages('Step 1'))
+
+        self.assertEqual(9, len(responses))
+        self.assertEqual([False, False, False, False, True, False, False, False, False],
+                         [r.executionResult.failed for r in responses])
+        self.assertEqual(['before', 'Step 1', 'after', 'before', 'after', 'before', 'Step 1', 'after'], calls)
+
+        del calls[:]
+        responses = processor.process_execute_steps_request(
+            step_messages('Step 1') + step_messages('Unknown step') + step_messages('Step 1'))
+
+        self.assertEqual(6, len(responses))
+        self.assertTrue(responses[4].executionResult.failed)
+        self.assertFalse(responses[4].executionResult.recoverableError)
+        self.assertEqual(['before', 'Step 1', 'after', 'before', 'after'], calls)
+
+    def test_Processor_execute_steps_request_after_failing_step_hook(self):
+        calls = []
+        registry.add_before_step(failing_impl)
+        registry.add_after_step(lambda: calls.append('after'))
+        registry.add_step('Step 1', lambda: calls.append('Step 1'), '')
+
+        responses = processor.process_execute_steps_request([
+            Message(messageType=Message.StepExecutionStarting,
+                    stepExecutionStartingRequest=StepExecutionStartingRequest()),
+            Message(messageType=Message.ExecuteStep, executeStepRequest=ExecuteStepRequest(parsedStepText='Step 1')),
+            Message(messageType=Message.StepExecutionEnding, stepExecutionEndingRequest=StepExecutionEndingRequest()),
+            Message(messageType=Message.StepExecutionStarting,
+                    stepExecutionStartingRequest=StepExecutionStartingRequest()),
+        ])
+
+        self.assertEqual(2, len(responses))
+        self.assertTrue(responses[0].executionResult.failed)
+        self.assertFalse(responses[1].executionResult.failed)
+        self.assertEqual(['after'], calls)
+
+        with self.assertRaises(ValueError):
+            processor.process_execute_steps_request([Message(messageType=Message.StepNamesRequest)])
+
+    def test_Processor_streamed_execute_step_request(self):
+        sent = []
+
+        def impl():
+            Messages.write_message('first')
+            self.assertEqual(1, len(sent))
+            Messages.write_message('second')
+
+        registry.add_step('Step 1', impl, '')
+
+        processor.process_streamed(processor.process_execute_step_request,
+                                   (ExecuteStepRequest(parsedStepText='Step 1'),), sent.append)
+
+        self.assertEqual([['first'], ['second'], []], [list(r.executionResult.message) for r in sent])
+        self.assertGreaterEqual(sent[2].executionResult.executionTime, 0)
+        registry.add_step('Step 2', lambda: Messages.write_message('pending'), '')
+        response = processor.process_execute_step_request(ExecuteStepRequest(parsedStepText='Step 2'))
+        self.assertEqual(['pending'], response.executionResult.message)
+
+    def test_Processor_streamed_screenshots_are_sent_once_written(self):
+        sent, written = [], threading.Event()
+
+        class Image:
+            def save(self, file, format):
+                written.wait(5)
+                file.write(b'content')
+
+        def impl():
+            Screenshots.capture_screenshot()
+            self.assertEqual([], sent)
+            written.set()
+
+        registry.add_step('Step 1', impl, '')
+        provider = registry.screenshot_provider(), registry.is_screenshot_writer
+        registry.set_screenshot_provider(lambda: Image(), False)
+        self.addCleanup(registry.set_screenshot_provider, *provider)
+        self.fs.create_dir('screenshots')
+        with patch.dict(os.environ, {'gauge_screenshots_dir': 'screenshots'}):
+            processor.process_streamed(processor.process_execute_step_request,
+                                       (ExecuteStepRequest(parsedStepText='Step 1'),), sent.append)
+
+        self.assertEqual(2, len(sent))
+        screenshot = sent[0].executionResult.screenshotFiles[0]
+        with open(path.join('screenshots', screenshot), 'rb') as f:
+            self.assertEqual(b'content', f.read())
+        self.assertFalse(sent[1].executionResult.failed)
+        self.assertEqual([], list(sent[1].executionResult.screenshotFiles))
+
+    def test_Processor_failure_screenshots_of_identical_screens_share_a_file(self):
+        registry.add_step('Step 1', failing_impl, '')
+        provider = registry.screenshot_provider(), registry.is_screenshot_writer
+        registry.set_screenshot_provider(lambda: b'content', False)
+        self.addCleanup(registry.set_screenshot_provider, *provider)
+        self.fs.create_dir('screenshots')
+        with patch.dict(os.environ, {'gauge_screenshots_dir': 'screenshots', 'screenshot_on_failure': 'true'}):
+            responses = [processor.process_execute_step_request(ExecuteStepRequest(parsedStepText='Step 1'))
+                         for _ in range(2)]
+
+        screenshots = [r.executionResult.failureScreenshotFile for r in responses]
+        self.assertTrue(all(r.executionResult.failed for r in responses))
+        self.assertEqual(screenshots[0], screenshots[1])
+        self.assertEqual([screenshots[0]], os.listdir('screenshots'))
+
     def test_Processor_failing_starting_execution_request(self):
         registry.add_before_suite(failing_impl)
         request = ExecutionStartingRequest()
@@ -0,0 +1,76 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from getgauge import processor, profiler
+from getgauge.messages.messages_pb2 import (ExecuteStepRequest, ExecutionEndingRequest, ExecutionStartingRequest,
+                                            ScenarioExecutionStartingRequest)
+from getgauge.registry import registry
+
+
+def impl(name):
+    pass
+
+
+def hook(context):
+    pass
+
+
+class ProfilerTests(TestCase):
+    def setUp(self):
+        self.reports_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.reports_dir)
+        patcher = patch.dict(os.environ, {'GAUGE_PYTHON_PROFILE': 'true', 'gauge_reports_dir': self.reports_dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_execution_records_implementations_and_writes_report(self):
+        registry.add_step('Greet <name>', impl, '')
+        registry.add_before_scenario(hook, '<slow>')
+        processor.process_execution_starting_request(ExecutionStartingRequest(), False)
+        scenario = ScenarioExecutionStartingRequest()
+        scenario.currentExecutionInfo.currentScenario.tags.append('slow')
+        processor.process_scenario_execution_starting_request(scenario)
+        step = ExecuteStepRequest()
+        step.parsedStepText = 'Greet {}'
+        step.parameters.add().value = 'world'
+        for _ in range(2):
+            processor.process_execute_step_request(step)
+        profiler.call(processor.process_execute_step_request, step)
+
+        entries = {(entry['category'], entry['name']): entry for entry in profiler.report()}
+        processor.process_execution_ending_request(ExecutionEndingRequest())
+
+        self.assertEqual(3, entries[('step', 'Greet <name>')]['count'])
+        self.assertEqual(3, entries[('arguments', 'Greet <name>')]['count'])
+        self.assertEqual(1, entries[('before_scenario', 'hook [<slow>]')]['count'])
+        self.assertEqual(1, entries[('runner', 'process_execute_step_request')]['count'])
+        self.assertFalse(profiler.enabled)
+        base = os.path.join(self.reports_dir, 'python-profile-{0}'.format(os.getpid()))
+        with open(base + '.json', encoding='utf-8') as f:
+            self.assertEqual(profiler.COLUMNS, tuple(json.load(f)[0]))
+        with open(base + '.csv', encoding='utf-8') as f:
+            self.assertEqual(len(entries), len(list(csv.DictReader(f))))
+
+    def test_nothing_is_recorded_unless_enabled(self):
+        registry.add_step('Greet <name>', impl, '')
+        with patch.dict(os.environ, {'GAUGE_PYTHON_PROFILE': ''}):
+            processor.process_execution_starting_request(ExecutionStartingRequest(), False)
+        step = ExecuteStepRequest()
+        step.parsedStepText = 'Greet {}'
+        step.parameters.add().value = 'world'
+        processor.process_execute_step_request(step)
+        processor.process_execution_ending_request(ExecutionEndingRequest())
+
+        self.assertEqual([], profiler.report())
+        self.assertEqual([], os.listdir(self.reports_dir))
+
+
+if __name__ == '__main__':
+    main()
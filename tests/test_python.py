@@ -1,13 +1,20 @@
+import asyncio
+import contextvars
+import importlib.util
 import os
 import tempfile
-from unittest import TestCase, main
+import threading
+from unittest import TestCase, main, skipUnless
+from unittest.mock import patch
 from uuid import uuid1
 
+from getgauge import screenshots
 from getgauge.messages.messages_pb2 import Message
 from getgauge.python import (DataStore, DataStoreContainer, DictObject,
                              ExecutionContext, Messages, Scenario,
                              Specification, Step, Table,
-                             create_execution_context_from, data_store)
+                             create_execution_context_from, data_store,
+                             with_current_context)
 from getgauge.registry import MessagesStore, ScreenshotsStore, registry
 
 try:
@@ -53,6 +60,94 @@ class MessagesTests(TestCase):
 
         self.assertEqual(messages, pending_messages)
 
+    def test_pending_messages_past_the_limit_spill_to_a_file(self):
+        counters = MessagesStore.counters()
+        with patch.dict(os.environ, {'GAUGE_PYTHON_MESSAGES_LIMIT': '10'}):
+            for message in ['12345', '67890', 'spilled', 'ünïcode']:
+                Messages.write_message(message)
+            pending_messages = MessagesStore.pending_messages()
+
+        self.assertEqual(['12345', '67890'], pending_messages[:2])
+        self.assertEqual(3, len(pending_messages))
+        spill_file = pending_messages[2].rsplit(' ', 1)[1]
+        self.addCleanup(os.remove, spill_file)
+        self.assertIn('2 more messages (16 bytes)', pending_messages[2])
+        with open(spill_file, encoding='utf-8') as f:
+            self.assertEqual('spilled\nünïcode\n', f.read())
+        self.assertEqual(counters['spilled_messages'] + 2, MessagesStore.counters()['spilled_messages'])
+        self.assertEqual(counters['spilled_bytes'] + 16, MessagesStore.counters()['spilled_bytes'])
+
+        Messages.write_message('12345678901')
+        self.assertEqual(['12345678901'], MessagesStore.pending_messages())
+
+    def test_pending_messages_past_the_limit_are_dropped_when_they_cannot_spill(self):
+        counters = MessagesStore.counters()
+        with patch.dict(os.environ, {'GAUGE_PYTHON_MESSAGES_LIMIT': '5'}), \
+                patch('tempfile.NamedTemporaryFile', side_effect=OSError('read only')):
+            for message in ['12345', 'dropped']:
+                Messages.write_message(message)
+            pending_messages = MessagesStore.pending_messages()
+
+        self.assertEqual(['12345', '1 more messages (7 bytes) past the limit of 5 bytes were dropped'],
+                         pending_messages)
+        self.assertEqual(counters['dropped_bytes'] + 7, MessagesStore.counters()['dropped_bytes'])
+
+    def test_pending_messages_written_from_threads_stay_within_the_limit(self):
+        def write():
+            for _ in range(200):
+                Messages.write_message('12345')
+
+        with patch.dict(os.environ, {'GAUGE_PYTHON_MESSAGES_LIMIT': '500'}):
+            threads = [threading.Thread(target=write) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+            pending_messages = MessagesStore.pending_messages()
+
+        spill_file = pending_messages[-1].rsplit(' ', 1)[1]
+        self.addCleanup(os.remove, spill_file)
+        self.assertEqual(['12345'] * 100, pending_messages[:-1])
+        self.assertIn('1500 more messages (7500 bytes)', pending_messages[-1])
+
+    def test_pending_messages_of_bound_contexts_are_kept_apart(self):
+        written, reported = threading.Barrier(2), {}
+
+        def execute(name):
+            MessagesStore.bind()
+            ScreenshotsStore.bind()
+            Messages.write_message(name)
+            written.wait(5)
+            reported[name] = MessagesStore.pending_messages()
+
+        threads = [threading.Thread(target=execute, args=(name,)) for name in ('first', 'second')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual({'first': ['first'], 'second': ['second']}, reported)
+
+    def test_pending_messages_are_shared_with_tasks_and_threads_of_the_context(self):
+        async def write(message):
+            Messages.write_message(message)
+
+        async def step():
+            await asyncio.gather(write('task 1'), write('task 2'))
+            for target, message in ((with_current_context(Messages.write_message), 'thread'),
+                                    (Messages.write_message, 'unbound thread')):
+                thread = threading.Thread(target=target, args=(message,))
+                thread.start()
+                thread.join(5)
+
+        def execute():
+            MessagesStore.bind()
+            asyncio.run(step())
+            return MessagesStore.pending_messages()
+
+        self.assertEqual(['task 1', 'task 2', 'thread'], contextvars.copy_context().run(execute))
+        self.assertEqual(['unbound thread'], MessagesStore.pending_messages())
+
 
 class DataStoreTests(TestCase):
     def test_data_store(self):
@@ -509,7 +604,8 @@ class ScreenshotsTests(TestCase):
         ScreenshotsStore.capture()
         pending_screenshots = ScreenshotsStore.pending_screenshots()
         self.assertEqual(1, len(pending_screenshots))
-        self.assertNotEqual(screenshot_file, pending_screenshots[0])
+        # The same screen again, reported with the file written before.
+        self.assertEqual(screenshot_file, pending_screenshots[0])
 
     def test_capture_shoould_vefify_screenshot_file_for_file_based_custom_screenshot(self):
         first_screenshot = os.path.join(
@@ -532,6 +628,164 @@ class ScreenshotsTests(TestCase):
         self.assertEqual([os.path.basename(second_screenshot)],
                          ScreenshotsStore.pending_screenshots())
 
+    def test_capture_with_capture_backend(self):
+        class Image:
+            def save(self, file, format):
+                file.write(format.encode())
+
+        registry.set_screenshot_provider(screenshots.capture, False)
+        backend = ScreenshotsStore.set_capture_backend(lambda: Image())
+        self.addCleanup(ScreenshotsStore.set_capture_backend, backend)
+        timings = ScreenshotsStore.timings()
+
+        ScreenshotsStore.capture()
+        pending_screenshots = ScreenshotsStore.pending_screenshots()
+
+        self.assertEqual(1, len(pending_screenshots))
+        with open(os.path.join(os.getenv("gauge_screenshots_dir"), pending_screenshots[0]), 'rb') as f:
+            self.assertEqual(b'PNG', f.read())
+        self.assertEqual(timings['captures'] + 1, ScreenshotsStore.timings()['captures'])
+        self.assertEqual(timings['writes'] + 1, ScreenshotsStore.timings()['writes'])
+
+    def test_capture_writes_files_in_the_background(self):
+        written = threading.Event()
+
+        class Image:
+            def save(self, file, format):
+                written.wait(5)
+                file.write(b'content')
+
+        registry.set_screenshot_provider(lambda: Image(), False)
+        screenshot = ScreenshotsStore.capture_to_file()
+        screenshot_file = os.path.join(os.getenv("gauge_screenshots_dir"), screenshot)
+
+        self.assertFalse(os.path.exists(screenshot_file) and os.path.getsize(screenshot_file))
+
+        written.set()
+        ScreenshotsStore.wait_for_writes()
+
+        with open(screenshot_file, 'rb') as f:
+            self.assertEqual(b'content', f.read())
+
+    def test_capture_waits_for_the_writer_once_the_queue_is_full(self):
+        written = threading.Event()
+
+        class Image:
+            def save(self, file, format):
+                written.wait(5)
+
+        registry.set_screenshot_provider(lambda: Image(), False)
+        timings = ScreenshotsStore.timings()
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_QUEUE": "1"}):
+            ScreenshotsStore.capture_to_file()
+            second = threading.Thread(target=ScreenshotsStore.capture_to_file)
+            second.start()
+            second.join(0.1)
+
+            self.assertTrue(second.is_alive())
+
+            written.set()
+            second.join(5)
+            ScreenshotsStore.wait_for_writes()
+
+        self.assertFalse(second.is_alive())
+        self.assertEqual(timings['blocked_writes'] + 1, ScreenshotsStore.timings()['blocked_writes'])
+
+    def test_capture_writes_files_right_away_without_queue(self):
+        registry.set_screenshot_provider(lambda: b'content', False)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_QUEUE": "0"}):
+            screenshot = ScreenshotsStore.capture_to_file()
+
+        with open(os.path.join(os.getenv("gauge_screenshots_dir"), screenshot), 'rb') as f:
+            self.assertEqual(b'content', f.read())
+        ScreenshotsStore.wait_for_writes()
+
+    def test_capture_reports_identical_screenshots_with_the_file_of_the_first(self):
+        registry.set_screenshot_provider(lambda: b'content', False)
+        ScreenshotsStore.capture()
+        ScreenshotsStore.capture()
+        first, second = ScreenshotsStore.pending_screenshots()
+        ScreenshotsStore.forget_files()
+        ScreenshotsStore.capture()
+        third, = ScreenshotsStore.pending_screenshots()
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+        self.assertEqual(sorted([first, third]), sorted(os.listdir(os.getenv("gauge_screenshots_dir"))))
+
+    def test_capture_file_gives_the_name_of_the_file_once_written(self):
+        registry.set_screenshot_provider(lambda: b'content', False)
+        first, second = ScreenshotsStore.capture_file(), ScreenshotsStore.capture_file()
+        ScreenshotsStore.wait_for_writes()
+
+        self.assertEqual(first.result(5), second.result(5))
+        self.assertEqual([first.result()], os.listdir(os.getenv("gauge_screenshots_dir")))
+
+    def test_capture_to_file_links_names_of_identical_screenshots(self):
+        registry.set_screenshot_provider(lambda: b'content', False)
+        timings = ScreenshotsStore.timings()
+        first = ScreenshotsStore.capture_to_file()
+        second = ScreenshotsStore.capture_to_file()
+        ScreenshotsStore.forget_files()
+        third = ScreenshotsStore.capture_to_file()
+        ScreenshotsStore.wait_for_writes()
+
+        files = [os.path.join(os.getenv("gauge_screenshots_dir"), name) for name in (first, second, third)]
+        self.assertEqual(3, len(set(files)))
+        self.assertTrue(os.path.samefile(files[0], files[1]))
+        self.assertFalse(os.path.samefile(files[0], files[2]))
+        self.assertEqual(timings['writes'] + 2, ScreenshotsStore.timings()['writes'])
+        self.assertEqual(timings['reused_files'] + 1, ScreenshotsStore.timings()['reused_files'])
+
+    def test_capture_compares_screenshots_on_the_writer_thread(self):
+        threads = []
+
+        class Image:
+            mode, size = 'RGB', (1, 1)
+
+            def tobytes(self):
+                threads.append(threading.current_thread())
+                return b'pixels'
+
+            def save(self, file, format):
+                file.write(b'content')
+
+        registry.set_screenshot_provider(lambda: Image(), False)
+        ScreenshotsStore.capture_to_file()
+        ScreenshotsStore.wait_for_writes()
+
+        self.assertEqual(1, len(threads))
+        self.assertNotEqual(threading.current_thread(), threads[0])
+
+    @skipUnless(importlib.util.find_spec('PIL'), 'requires Pillow')
+    def test_capture_scales_screenshots_down(self):
+        from PIL import Image
+        registry.set_screenshot_provider(lambda: Image.new('RGB', (400, 100)), False)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_MAX_SIZE": "200"}):
+            screenshot = ScreenshotsStore.capture_to_file()
+            ScreenshotsStore.wait_for_writes()
+
+        with Image.open(os.path.join(os.getenv("gauge_screenshots_dir"), screenshot)) as image:
+            self.assertEqual((200, 50), image.size)
+
+    @skipUnless(importlib.util.find_spec('PIL'), 'requires Pillow')
+    def test_capture_reduces_colors_of_screenshots(self):
+        from PIL import Image, ImageDraw
+        image = Image.new('RGB', (64, 64))
+        ImageDraw.Draw(image).rectangle((0, 0, 31, 63), fill=(255, 0, 0))
+        registry.set_screenshot_provider(lambda: image, False)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_COLORS": "16"}):
+            screenshot = ScreenshotsStore.capture_to_file()
+            ScreenshotsStore.wait_for_writes()
+
+        with Image.open(os.path.join(os.getenv("gauge_screenshots_dir"), screenshot)) as written:
+            self.assertEqual('P', written.mode)
+            self.assertLessEqual(len(written.getcolors()), 16)
+
+    def test_capture_without_content(self):
+        registry.set_screenshot_provider(lambda: None, False)
+        self.assertEqual("", ScreenshotsStore.capture_to_file())
+
     def tearDown(self):
         registry.set_screenshot_provider(
             self.__old_screenshot_provider, self.__is_screenshot_writer)
@@ -18,9 +18,9 @@ class RefactorTests(unittest.TestCase):
         with open(RefactorTests.path, 'w', encoding="utf-8") as refactor_file:
             RefactorTests.file = refactor_file
             RefactorTests.file.write("""@step("Vowels in English language are <vowels>.")
-    def assert_default_vowels(arg0):
-        Messages.write_message("Given vowels are {0}".format(given_vowels))
-        assert given_vowels == "".join(vowels)\n""")
+def assert_default_vowels(arg0):
+    Messages.write_message("Given vowels are {0}".format(given_vowels))
+    assert given_vowels == "".join(vowels)\n""")
 
         with open(RefactorTests.path, 'r', encoding="utf-8") as refactor_file:
             RefactorTests.file = refactor_file
@@ -33,7 +33,6 @@ class RefactorTests(unittest.TestCase):
         registry.clear()
 
     def test_Processor_refactor_request_with_add_param(self):
-        response = Message()
         request = Message()
         request.refactorRequest.saveChanges = True
         request.refactorRequest.oldStepValue.stepValue = 'Vowels in English language are {}.'
@@ -50,14 +49,13 @@ class RefactorTests(unittest.TestCase):
         param_position.newPosition = 1
         request.refactorRequest.paramPositions.extend([position, param_position])
 
-        processor.refactor_step(request.refactorRequest, response)
+        response = processor.process_refactor_request(request.refactorRequest)
         actual_data = self.getActualText()
 
-        self.assertEqual(Message.RefactorResponse, response.messageType)
-        self.assertTrue(response.refactorResponse.success, response.refactorResponse.error)
+        self.assertTrue(response.success, response.error)
 
         self.assertEqual([RefactorTests.path],
-                         response.refactorResponse.filesChanged)
+                         response.filesChanged)
 
         expected = """@step("Vowels in English language is <vowels> <bsdfdsf>.")
 def assert_default_vowels(arg0, arg1):
@@ -67,7 +65,6 @@ def assert_default_vowels(arg0, arg1):
         self.assertEqual(expected, actual_data)
 
     def test_Processor_refactor_request_with_add_param_and_invalid_identifier(self):
-        response = Message()
         request = Message()
         request.refactorRequest.saveChanges = True
         request.refactorRequest.oldStepValue.stepValue = 'Vowels in English language are {}.'
@@ -84,14 +81,13 @@ def assert_default_vowels(arg0, arg1):
         param_position.newPosition = 1
         request.refactorRequest.paramPositions.extend([position, param_position])
 
-        processor.refactor_step(request.refactorRequest, response)
+        response = processor.process_refactor_request(request.refactorRequest)
         actual_data = self.getActualText()
 
-        self.assertEqual(Message.RefactorResponse, response.messageType)
-        self.assertTrue(response.refactorResponse.success, response.refactorResponse.error)
+        self.assertTrue(response.success, response.error)
 
         self.assertEqual([RefactorTests.path],
-                         response.refactorResponse.filesChanged)
+                         response.filesChanged)
 
         expected = """@step("Vowels in English language is <vowels> <vowels!2_ab%$>.")
 def assert_default_vowels(arg0, arg1):
@@ -101,7 +97,6 @@ def assert_default_vowels(arg0, arg1):
         self.assertEqual(expected, actual_data)
 
     def test_Processor_refactor_request_with_add_param_and_only_invalid_identifier(self):
-        response = Message()
         request = Message()
         request.refactorRequest.saveChanges = True
         request.refactorRequest.oldStepValue.stepValue = 'Vowels in English language are {}.'
@@ -118,14 +113,13 @@ def assert_default_vowels(arg0, arg1):
         param_position.newPosition = 1
         request.refactorRequest.paramPositions.extend([position, param_position])
 
-        processor.refactor_step(request.refactorRequest, response)
+        response = processor.process_refactor_request(request.refactorRequest)
         actual_data = self.getActualText()
 
-        self.assertEqual(Message.RefactorResponse, response.messageType)
-        self.assertTrue(response.refactorResponse.success, response.refactorResponse.error)
+        self.assertTrue(response.success, response.error)
 
         self.assertEqual([RefactorTests.path],
-                         response.refactorResponse.filesChanged)
+                         response.filesChanged)
 
         expected = """@step("Vowels in English language is <vowels> <!%$>.")
 def assert_default_vowels(arg0, arg1):
@@ -135,7 +129,6 @@ def assert_default_vowels(arg0, arg1):
         self.assertEqual(expected, actual_data)
 
     def test_Processor_refactor_request_with_remove_param(self):
-        response = Message()
         request = Message()
         request.refactorRequest.saveChanges = True
         request.refactorRequest.oldStepValue.stepValue = 'Vowels in English language are {}.'
@@ -143,15 +136,14 @@ def assert_default_vowels(arg0, arg1):
         request.refactorRequest.newStepValue.parameterizedStepValue = 'Vowels in English language is.'
         request.refactorRequest.newStepValue.stepValue = 'Vowels in English language is.'
 
-        processor.refactor_step(request.refactorRequest, response)
+        response = processor.process_refactor_request(request.refactorRequest)
 
         actual_data = self.getActualText()
 
-        self.assertEqual(Message.RefactorResponse, response.messageType)
-        self.assertTrue(response.refactorResponse.success, response.refactorResponse.error)
+        self.assertTrue(response.success, response.error)
 
         self.assertEqual([RefactorTests.path],
-                         response.refactorResponse.filesChanged)
+                         response.filesChanged)
 
         expected = """@step("Vowels in English language is.")
 def assert_default_vowels():
@@ -161,7 +153,6 @@ def assert_default_vowels():
         self.assertEqual(expected, actual_data)
 
     def test_Processor_refactor_request(self):
-        response = Message()
         request = Message()
         request.refactorRequest.saveChanges = True
         request.refactorRequest.oldStepValue.stepValue = 'Vowels in English language are {}.'
@@ -174,15 +165,14 @@ def assert_default_vowels():
         position.newPosition = 0
         request.refactorRequest.paramPositions.extend([position])
 
-        processor.refactor_step(request.refactorRequest, response)
+        response = processor.process_refactor_request(request.refactorRequest)
 
         actual_data = self.getActualText()
 
-        self.assertEqual(Message.RefactorResponse, response.messageType)
-        self.assertTrue(response.refactorResponse.success, response.refactorResponse.error)
+        self.assertTrue(response.success, response.error)
 
         self.assertEqual([RefactorTests.path],
-                         response.refactorResponse.filesChanged)
+                         response.filesChanged)
 
         expected = """@step("Vowels in English language is <vowels>.")
 def assert_default_vowels(arg0):
@@ -192,7 +182,6 @@ def assert_default_vowels(arg0):
         self.assertEqual(expected, actual_data)
 
     def test_Processor_refactor_request_with_add_and_remove_param(self):
-        response = Message()
         request = Message()
         request.refactorRequest.saveChanges = True
         request.refactorRequest.oldStepValue.stepValue = 'Vowels in English language are {}.'
@@ -205,15 +194,14 @@ def assert_default_vowels(arg0):
         param_position.newPosition = 0
         request.refactorRequest.paramPositions.extend([param_position])
 
-        processor.refactor_step(request.refactorRequest, response)
+        response = processor.process_refactor_request(request.refactorRequest)
 
         actual_data = self.getActualText()
 
-        self.assertEqual(Message.RefactorResponse, response.messageType)
-        self.assertTrue(response.refactorResponse.success, response.refactorResponse.error)
+        self.assertTrue(response.success, response.error)
 
         self.assertEqual([RefactorTests.path],
-                         response.refactorResponse.filesChanged)
+                         response.filesChanged)
 
         expected = """@step("Vowels in English language is <bsdfdsf>.")
 def assert_default_vowels(arg1):
@@ -223,7 +211,6 @@ def assert_default_vowels(arg1):
         self.assertEqual(expected, actual_data)
 
     def test_processor_refactor_request_with_insert_param(self):
-        response = Message()
         request = Message()
         request.refactorRequest.saveChanges = True
 
@@ -243,15 +230,14 @@ def assert_default_vowels(arg1):
         param2_position.newPosition = 1
         request.refactorRequest.paramPositions.extend([param1_position, param2_position])
 
-        processor.refactor_step(request.refactorRequest, response)
+        response = processor.process_refactor_request(request.refactorRequest)
 
         actual_data = self.getActualText()
 
-        self.assertEqual(Message.RefactorResponse, response.messageType)
-        self.assertTrue(response.refactorResponse.success, response.refactorResponse.error)
+        self.assertTrue(response.success, response.error)
 
         self.assertEqual([RefactorTests.path],
-                         response.refactorResponse.filesChanged)
+                         response.filesChanged)
 
         expected = """@step("Vowels in English language is <a> <vowels>.")
 def assert_default_vowels(arg1, arg0):
@@ -261,7 +247,6 @@ def assert_default_vowels(arg1, arg0):
         self.assertEqual(expected, actual_data)
 
     def test_Processor_refactor_request_without_save_change_with_add_param(self):
-        response = Message()
         request = Message()
 
         request.refactorRequest.saveChanges = False
@@ -281,7 +266,7 @@ is <vowels> <bsdfdsf>.'
 
         old_content = self.getActualText()
 
-        processor.refactor_step(request.refactorRequest, response)
+        response = processor.process_refactor_request(request.refactorRequest)
 
         expected = """@step("Vowels in English language is <vowels> <bsdfdsf>.")
 def assert_default_vowels(arg0, arg1):
@@ -289,18 +274,16 @@ def assert_default_vowels(arg0, arg1):
     assert given_vowels == "".join(vowels)
 """
 
-        self.assertEqual(Message.RefactorResponse, response.messageType)
-        self.assertTrue(response.refactorResponse.success, response.refactorResponse.error)
+        self.assertTrue(response.success, response.error)
 
         self.assertEqual([RefactorTests.path],
-                         response.refactorResponse.filesChanged)
+                         response.filesChanged)
 
-        self.assertEqual(RefactorTests.path, response.refactorResponse.fileChanges[0].fileName)
-        self.assertEqual(expected, response.refactorResponse.fileChanges[0].fileContent)
+        self.assertEqual(RefactorTests.path, response.fileChanges[0].fileName)
+        self.assertEqual(expected, response.fileChanges[0].fileContent)
         self.assertEqual(old_content, self.getActualText())
 
     def test_Processor_refactor_request_without_save_changes_add_param_and_invalid_identifier(self):
-        response = Message()
         request = Message()
 
         request.refactorRequest.saveChanges = False
@@ -320,21 +303,20 @@ def assert_default_vowels(arg0, arg1):
 
         old_content = self.getActualText()
 
-        processor.refactor_step(request.refactorRequest, response)
+        response = processor.process_refactor_request(request.refactorRequest)
 
-        self.assertEqual(Message.RefactorResponse, response.messageType)
-        self.assertTrue(response.refactorResponse.success, response.refactorResponse.error)
+        self.assertTrue(response.success, response.error)
 
         self.assertEqual([RefactorTests.path],
-                         response.refactorResponse.filesChanged)
+                         response.filesChanged)
         expected = """@step("Vowels in English language is <vowels> <vowels!2_ab%$>.")
 def assert_default_vowels(arg0, arg1):
     Messages.write_message("Given vowels are {0}".format(given_vowels))
     assert given_vowels == "".join(vowels)
 """
-        self.assertEqual(expected, response.refactorResponse.fileChanges[0].fileContent)
+        self.assertEqual(expected, response.fileChanges[0].fileContent)
         self.assertEqual(old_content, self.getActualText())
-        diff_contents = [diff.content for diff in response.refactorResponse.fileChanges[0].diffs]
+        diff_contents = [diff.content for diff in response.fileChanges[0].diffs]
         self.assertIn('"Vowels in English language is <vowels> <vowels!2_ab%$>."', diff_contents)
         self.assertIn('arg0, arg1', diff_contents)
 
@@ -1,6 +1,8 @@
+import inspect
 import re
 import sys
 import unittest
+from unittest.mock import patch
 
 from getgauge.registry import Registry
 
@@ -292,6 +294,30 @@ class RegistryTests(unittest.TestCase):
         self.assertEqual([info1['func'], info3['func']], [i.impl for i in registry.after_step(['A'])])
         self.assertEqual([info1['func']], [i.impl for i in registry.after_step(['A', 'c'])])
 
+    def test_Registry_hooks_with_tags_containing_spaces_and_operators(self):
+        registry.add_before_scenario('func1', '<smoke test> & (not <slow>)')
+        registry.add_before_scenario('func2', '<smoke test> | <api-v1.0>')
+
+        self.assertEqual(['func1', 'func2'], [i.impl for i in registry.before_scenario(['smoke test'])])
+        self.assertEqual(['func2'], [i.impl for i in registry.before_scenario(['smoke test', 'slow'])])
+        self.assertEqual(['func2'], [i.impl for i in registry.before_scenario(['api-v1.0'])])
+        self.assertEqual([], registry.before_scenario(['slow']))
+
+    def test_Registry_hooks_with_tags_are_not_evaluated_as_code(self):
+        registry.add_before_scenario('func', '<a> or __import__("os").getcwd()')
+
+        with self.assertRaises(ValueError):
+            registry.before_scenario(['a'])
+
+    def test_Registry_hooks_for_tags_are_refreshed_when_hooks_are_added(self):
+        registry.add_before_step('func1', '<a>')
+        self.assertEqual(['func1'], [i.impl for i in registry.before_step(['a', 'b'])])
+        self.assertIs(registry.before_step(['b', 'a', 'a']), registry.before_step(['a', 'b']))
+
+        registry.add_before_step('func2', '<b>')
+
+        self.assertEqual(['func1', 'func2'], [i.impl for i in registry.before_step(['a', 'b'])])
+
     def test_Registry__step_positions_of_a_given_file(self):
         infos = [{'text': 'Say <hello> to <getgauge>', 'func': 'func', 'file_name': 'foo.py', 'span': {'start': 1}},
                  {'text': 'Step 1', 'func': 'func1', 'file_name': 'bar.py', 'span': {'start': 3}}]
@@ -334,6 +360,78 @@ class RegistryTests(unittest.TestCase):
         self.assertTrue(registry.is_implemented('Step 1'))
         self.assertFalse(registry.has_multiple_impls('Step 1'))
 
+    def test_Registry_remove_steps_keeps_file_lookups_consistent(self):
+        registry.add_step('Step 1', 'func', 'foo.py', {'start': 1})
+        registry.add_step(['Step 2', 'Step <a>'], 'func1', 'foo.py', {'start': 5})
+        registry.add_step('Step 1', 'func2', 'bar.py', {'start': 3})
+        registry.add_before_step('hook', None, 'foo.py')
+
+        registry.remove_steps('foo.py')
+
+        self.assertEqual([], registry.get_step_positions('foo.py'))
+        self.assertFalse(registry.is_file_cached('foo.py'))
+        self.assertEqual(['hook'], [i.impl for i in registry.get_all_methods_in('foo.py')])
+        self.assertEqual(['Step 1'], registry.steps())
+        self.assertEqual('func2', registry.get_info_for('Step 1').impl)
+        self.assertEqual([{'stepValue': 'Step 1', 'span': {'start': 3}}], registry.get_step_positions('bar.py'))
+
+        registry.add_step('Step 2', 'func3', 'foo.py', {'start': 7})
+
+        self.assertEqual([{'stepValue': 'Step 2', 'span': {'start': 7}}], registry.get_step_positions('foo.py'))
+        self.assertTrue(registry.is_file_cached('foo.py'))
+
+    def test_Registry_remove_file_removes_its_steps_and_hooks(self):
+        registry.add_step('Step 1', 'func', 'foo.py')
+        registry.add_step('Step 2', 'func1', 'bar.py')
+        registry.add_before_scenario('hook', '<tag>', 'foo.py')
+        registry.add_before_scenario('hook1', None, 'bar.py')
+
+        self.assertEqual(['hook', 'hook1'], [i.impl for i in registry.before_scenario(['tag'])])
+
+        registry.remove_file('foo.py')
+
+        self.assertEqual(['Step 2'], registry.steps())
+        self.assertEqual([], registry.get_all_methods_in('foo.py'))
+        self.assertEqual(['hook1'], [i.impl for i in registry.before_scenario(['tag'])])
+
+    def test_Registry_clear_removes_file_lookups(self):
+        registry.add_step('Step 1', 'func', 'foo.py')
+        registry.add_after_scenario('hook', None, 'foo.py')
+
+        registry.clear()
+
+        self.assertFalse(registry.is_file_cached('foo.py'))
+        self.assertEqual([], registry.get_all_methods_in('foo.py'))
+
+    def test_Registry_infos_compute_args_length_once(self):
+        def step_impl(self, a, b):
+            pass
+
+        registry.add_step('Step <a> and <b>', step_impl, 'foo.py')
+        registry.add_before_step(step_impl, None, 'foo.py')
+        step_info = registry.get_info_for('Step {} and {}')
+        hook_info = registry.before_step()[0]
+
+        with patch('getgauge.registry.inspect.signature', wraps=inspect.signature) as signature:
+            for _ in range(3):
+                self.assertEqual(3, step_info.args_length)
+                self.assertEqual(3, hook_info.args_length)
+
+        self.assertEqual(2, signature.call_count)
+
+    def test_Registry_infos_are_slotted_and_store_compact_spans(self):
+        span = {'start': 1, 'startChar': 0, 'end': 3, 'endChar': 4}
+        registry.add_step('Step 1', 'func', 'foo.py', span)
+        registry.add_step('Step 2', 'func', 'foo.py', lambda: span)
+        registry.add_before_step('hook', None, 'foo.py')
+
+        for info in [registry.get_info_for('Step 1'), registry.get_info_for('Step 2'), registry.before_step()[0]]:
+            self.assertFalse(hasattr(info, '__dict__'))
+        self.assertEqual(span, registry.get_info_for('Step 1').span)
+        self.assertEqual(span, registry.get_info_for('Step 2').span)
+        self.assertIs(registry.get_info_for('Step 1').span, registry.get_info_for('Step 1').span)
+        self.assertEqual([], registry.get_info_for('Step 1').aliases)
+
     def test_Registry_is_file_cached(self):
         info = {'text': 'Say <hello> to <getgauge>', 'func': 'func', 'file_name': 'foo.py'}
         registry.add_step(info['text'], info['func'], info['file_name'])
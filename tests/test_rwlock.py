@@ -0,0 +1,64 @@
+import threading
+import time
+import unittest
+
+from getgauge.rwlock import ReadWriteLock
+
+
+class ReadWriteLockTests(unittest.TestCase):
+    def setUp(self):
+        self.lock = ReadWriteLock()
+
+    def test_readers_share_the_lock(self):
+        inside = threading.Barrier(3, timeout=5)
+
+        def read():
+            with self.lock.read():
+                inside.wait()
+
+        readers = [threading.Thread(target=read) for _ in range(2)]
+        for reader in readers:
+            reader.start()
+        inside.wait()
+        for reader in readers:
+            reader.join()
+
+    def test_writer_waits_for_readers_and_excludes_them(self):
+        events = []
+        reading = threading.Event()
+
+        def write():
+            with self.lock.write():
+                events.append('write')
+
+        def read():
+            with self.lock.read():
+                events.append('late read')
+
+        with self.lock.read():
+            writer = threading.Thread(target=write)
+            writer.start()
+            time.sleep(0.1)
+            late_reader = threading.Thread(target=read)
+            late_reader.start()
+            time.sleep(0.1)
+            events.append('read')
+        writer.join(5)
+        late_reader.join(5)
+
+        self.assertEqual(['read', 'write', 'late read'], events)
+
+    def test_lock_is_released_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.lock.write():
+                raise RuntimeError()
+        with self.assertRaises(RuntimeError):
+            with self.lock.read():
+                raise RuntimeError()
+
+        with self.lock.write():
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,13 @@
+import os
+import shutil
 import sys
+import tempfile
 import unittest
 from textwrap import dedent
+from unittest.mock import patch
 from getgauge.registry import registry
 from getgauge.parser import Parser
-from getgauge.static_loader import load_steps, reload_steps
+from getgauge.static_loader import load_files, load_steps, reload_steps, scan_file
 
 
 class StaticLoaderTests(unittest.TestCase):
@@ -137,6 +141,59 @@ class StaticLoaderTests(unittest.TestCase):
 
         self.assertFalse(registry.is_implemented("print hello {}"))
 
+    def test_scan_file_returns_step_records(self):
+        impl_dir = self.create_impl_dir({'foo.py': '''\
+            @step("print <word>")
+            def print_word(word):
+                print(word)
+            '''})
+        file_path = os.path.join(impl_dir, 'foo.py')
+
+        self.assertEqual(scan_file(file_path), [
+            ("print <word>", "print_word", file_path,
+             {'start': 1, 'startChar': 0, 'end': 4, 'endChar': 0}),
+        ])
+
+    def test_load_files_populates_registry_from_all_impl_files(self):
+        impl_dir = self.create_impl_dir(self.impl_files())
+
+        load_files([impl_dir])
+
+        self.assert_impl_files_loaded(impl_dir)
+
+    def test_load_files_populates_registry_using_worker_processes(self):
+        impl_dir = self.create_impl_dir(self.impl_files())
+
+        with patch.dict(os.environ, {'GAUGE_PYTHON_LOADER_WORKERS': '2'}):
+            load_files([impl_dir])
+
+        self.assert_impl_files_loaded(impl_dir)
+
+    def impl_files(self):
+        files = {'step_{}.py'.format(i): '''\
+            @step("print {0}")
+            def print_{0}():
+                print("{0}")
+            '''.format(i) for i in range(4)}
+        files[os.path.join('nested', 'invalid.py')] = '@step("print invalid"'
+        return files
+
+    def assert_impl_files_loaded(self, impl_dir):
+        self.assertEqual(sorted(registry.steps()), ['print {}'.format(i) for i in range(4)])
+        info = registry.get_info_for('print 2')
+        self.assertEqual(info.file_name, os.path.join(impl_dir, 'step_2.py'))
+        self.assertEqual(info.span, {'start': 1, 'startChar': 0, 'end': 4, 'endChar': 0})
+
+    def create_impl_dir(self, files):
+        impl_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, impl_dir)
+        for name, content in files.items():
+            file_path = os.path.join(impl_dir, name)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(dedent(content))
+        return impl_dir
+
     def tearDown(self):
         registry.clear()
 
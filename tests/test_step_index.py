@@ -0,0 +1,154 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from textwrap import dedent
+from unittest.mock import patch
+
+from getgauge import static_loader
+from getgauge.registry import registry
+from getgauge.static_loader import load_files
+from getgauge.step_index import STEP_INDEX_VERSION, StepIndex
+
+
+class StepIndexTests(unittest.TestCase):
+    def setUp(self):
+        registry.clear()
+        self.project_dir = tempfile.mkdtemp()
+        self.impl_dir = os.path.join(self.project_dir, 'step_impl')
+        os.makedirs(self.impl_dir)
+        self.index_file = os.path.join(self.project_dir, '.gauge', 'python', 'step_index.json')
+        self.write_impl('foo.py', 'print hello')
+        self.write_impl('bar.py', 'print world')
+
+    def tearDown(self):
+        registry.clear()
+        shutil.rmtree(self.project_dir)
+
+    def write_impl(self, name, step_text):
+        with open(os.path.join(self.impl_dir, name), 'w', encoding='utf-8') as f:
+            f.write(dedent('''\
+            @step("{}")
+            def impl():
+                pass
+            ''').format(step_text))
+
+    def load(self, step_impl_dirs=None):
+        step_impl_dirs = step_impl_dirs or [self.impl_dir]
+        registry.clear()
+        index = StepIndex.load(step_impl_dirs, self.index_file)
+        with patch.object(static_loader, 'scan_file', wraps=static_loader.scan_file) as scan_file:
+            load_files(step_impl_dirs, index)
+        index.save()
+        return sorted(os.path.basename(c.args[0]) for c in scan_file.call_args_list)
+
+    def test_first_load_parses_all_files_and_saves_index(self):
+        self.assertEqual(self.load(), ['bar.py', 'foo.py'])
+
+        with open(self.index_file, encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data['version'], STEP_INDEX_VERSION)
+        self.assertEqual(data['stepImplDirs'], [self.impl_dir])
+        self.assertEqual(len(data['files']), 2)
+
+    def test_unchanged_files_are_loaded_from_index(self):
+        self.load()
+
+        self.assertEqual(self.load(), [])
+        self.assertEqual(sorted(registry.steps()), ['print hello', 'print world'])
+        info = registry.get_info_for('print hello')
+        self.assertEqual(info.file_name, os.path.join(self.impl_dir, 'foo.py'))
+        self.assertEqual(info.span, {'start': 1, 'startChar': 0, 'end': 4, 'endChar': 0})
+
+    def test_changed_files_are_parsed_again(self):
+        self.load()
+        self.write_impl('foo.py', 'print hello again')
+
+        self.assertEqual(self.load(), ['foo.py'])
+        self.assertEqual(sorted(registry.steps()), ['print hello again', 'print world'])
+
+    def test_touched_files_with_same_content_are_loaded_from_index(self):
+        self.load()
+        foo = os.path.join(self.impl_dir, 'foo.py')
+        os.utime(foo, ns=(0, 0))
+
+        self.assertEqual(self.load(), [])
+        self.assertEqual(self.load(), [])
+        self.assertEqual(sorted(registry.steps()), ['print hello', 'print world'])
+
+    def test_deleted_files_are_dropped_from_index(self):
+        self.load()
+        os.remove(os.path.join(self.impl_dir, 'bar.py'))
+
+        self.assertEqual(self.load(), [])
+        self.assertEqual(registry.steps(), ['print hello'])
+        with open(self.index_file, encoding='utf-8') as f:
+            self.assertEqual(list(json.load(f)['files']), [os.path.join(self.impl_dir, 'foo.py')])
+
+    def test_index_is_discarded_when_step_impl_dirs_change(self):
+        self.load()
+        other_dir = os.path.join(self.project_dir, 'other_impl')
+        os.makedirs(other_dir)
+
+        self.assertEqual(self.load([self.impl_dir, other_dir]), ['bar.py', 'foo.py'])
+
+    def test_index_is_discarded_when_version_differs(self):
+        self.load()
+        with open(self.index_file, encoding='utf-8') as f:
+            data = json.load(f)
+        data['version'] = STEP_INDEX_VERSION + 1
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+        self.assertEqual(self.load(), ['bar.py', 'foo.py'])
+
+    def test_corrupt_index_is_ignored(self):
+        os.makedirs(os.path.dirname(self.index_file))
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            f.write('{not json')
+
+        self.assertEqual(self.load(), ['bar.py', 'foo.py'])
+        self.assertEqual(self.load(), [])
+
+    def test_malformed_entries_are_parsed_again(self):
+        self.load()
+        with open(self.index_file, encoding='utf-8') as f:
+            data = json.load(f)
+        foo, bar = (os.path.join(self.impl_dir, name) for name in ('foo.py', 'bar.py'))
+        del data['files'][foo]['hash']
+        data['files'][bar]['steps'] = [['print world']]
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+        self.assertEqual(self.load(), ['bar.py', 'foo.py'])
+        self.assertEqual(sorted(registry.steps()), ['print hello', 'print world'])
+        self.assertEqual(self.load(), [])
+
+    def test_index_without_a_files_object_is_ignored(self):
+        os.makedirs(os.path.dirname(self.index_file))
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': STEP_INDEX_VERSION, 'stepImplDirs': [self.impl_dir], 'files': [self.impl_dir]}, f)
+
+        self.assertEqual(self.load(), ['bar.py', 'foo.py'])
+
+    def test_changed_files_are_read_once(self):
+        self.load()
+        self.write_impl('foo.py', 'print hello again')
+
+        with patch('builtins.open', wraps=open) as opened:
+            self.assertEqual(self.load(), ['foo.py'])
+        read = [c.args[0] for c in opened.call_args_list if c.args[0].startswith(self.impl_dir)]
+        self.assertEqual(read, [os.path.join(self.impl_dir, 'foo.py')])
+        self.assertEqual(sorted(registry.steps()), ['print hello again', 'print world'])
+
+    def test_files_which_fail_to_parse_are_not_indexed(self):
+        with open(os.path.join(self.impl_dir, 'invalid.py'), 'w', encoding='utf-8') as f:
+            f.write('@step("print invalid"')
+        self.load()
+
+        self.assertEqual(self.load(), ['invalid.py'])
+
+
+if __name__ == '__main__':
+    unittest.main()
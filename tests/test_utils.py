@@ -1,5 +1,7 @@
 from unittest import main, TestCase
-from getgauge.util import get_step_impl_dirs
+from unittest.mock import patch
+from getgauge.util import (get_grpc_workers, get_loader_workers, get_messages_limit, get_screenshot_colors,
+                           get_screenshot_max_size, get_screenshot_queue_size, get_step_impl_dirs)
 import os
 
 
@@ -22,5 +24,62 @@ class UtilTests(TestCase):
         expected = ["test" + os.path.sep +"step_impl"]
         self.assertEqual(dirs,expected)
 
+    def test_get_loader_workers_defaults_to_serial_loading(self):
+        with patch.dict(os.environ, {"GAUGE_PYTHON_LOADER_WORKERS": ""}):
+            self.assertEqual(get_loader_workers(), 1)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_LOADER_WORKERS": "many"}):
+            self.assertEqual(get_loader_workers(), 1)
+
+    def test_get_loader_workers_reads_env(self):
+        with patch.dict(os.environ, {"GAUGE_PYTHON_LOADER_WORKERS": "4"}):
+            self.assertEqual(get_loader_workers(), 4)
+
+    def test_get_workers_below_one_are_the_default(self):
+        with patch('getgauge.logger.warning') as warning:
+            with patch.dict(os.environ, {"GAUGE_PYTHON_LOADER_WORKERS": "0"}):
+                self.assertEqual(get_loader_workers(), 1)
+            with patch.dict(os.environ, {"GAUGE_PYTHON_GRPC_WORKERS": "-2", "enable_multithreading": "false"}):
+                self.assertEqual(get_grpc_workers(), 4)
+        self.assertEqual(2, warning.call_count)
+
+    def test_get_grpc_workers_adds_a_worker_per_parallel_stream(self):
+        with patch.dict(os.environ, {"GAUGE_PYTHON_GRPC_WORKERS": "4", "enable_multithreading": "false"}):
+            self.assertEqual(get_grpc_workers(), 4)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_GRPC_WORKERS": "4", "enable_multithreading": "true",
+                                     "GAUGE_PARALLEL_STREAMS_COUNT": "8"}):
+            self.assertEqual(get_grpc_workers(), 12)
+
+    def test_get_messages_limit_reads_env(self):
+        with patch.dict(os.environ, {"GAUGE_PYTHON_MESSAGES_LIMIT": ""}):
+            self.assertEqual(get_messages_limit(), 0)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_MESSAGES_LIMIT": "2048"}):
+            self.assertEqual(get_messages_limit(), 2048)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_MESSAGES_LIMIT": "-1"}):
+            self.assertEqual(get_messages_limit(), 0)
+
+    def test_get_screenshot_queue_size_reads_env(self):
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_QUEUE": ""}):
+            self.assertEqual(get_screenshot_queue_size(), 8)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_QUEUE": "2"}):
+            self.assertEqual(get_screenshot_queue_size(), 2)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_QUEUE": "no"}):
+            self.assertEqual(get_screenshot_queue_size(), 8)
+
+    def test_get_screenshot_max_size_reads_env(self):
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_MAX_SIZE": ""}):
+            self.assertEqual(get_screenshot_max_size(), 0)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_MAX_SIZE": "1280"}):
+            self.assertEqual(get_screenshot_max_size(), 1280)
+
+    def test_get_screenshot_colors_reads_env(self):
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_COLORS": ""}):
+            self.assertEqual(get_screenshot_colors(), 0)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_COLORS": "64"}):
+            self.assertEqual(get_screenshot_colors(), 64)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_COLORS": "1024"}):
+            self.assertEqual(get_screenshot_colors(), 256)
+        with patch.dict(os.environ, {"GAUGE_PYTHON_SCREENSHOT_COLORS": "1"}):
+            self.assertEqual(get_screenshot_colors(), 0)
+
 if __name__ == '__main__':
     main()
\ No newline at end of file